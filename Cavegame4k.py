@@ -1,25 +1,51 @@
 # cavegame_1_0.py
 # Single-file "Cave Game 1.0"-style voxel sandbox using Ursina.
 # Creative-only, caves, trees, flight, surface-only blocks, no files.
-# Install: pip install ursina
-# Run: python cavegame_1_0.py
+# Install: pip install ursina numpy
+# Run: python cavegame_1_0.py [--cache[=dir]]   (--cache keeps built chunks on disk)
+# Benchmarks (no window): python cavegame_1_0.py --bench-surface | --bench-generation
+#   | --bench-world [--size=64x32x64] [--edits=200] [--mesher=greedy] [--out=report.json]
 
 from ursina import *
 from ursina.prefabs.first_person_controller import FirstPersonController
+import atexit
+import functools
+import heapq
+import json
 import math
+import os
 import random
-from collections import defaultdict
+import sys
+import zlib
+import multiprocessing
+import numpy as np
+from collections import defaultdict, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, resource_tracker
+from panda3d.core import TransparencyAttrib
+try:
+    import resource     # peak memory in --bench-world; not on Windows
+except ImportError:
+    resource = None
 
 # ---------- App / window ----------
-app = Ursina()
-window.title = 'Cavegame 1.0'
-window.borderless = False
-window.fullscreen = False
-window.vsync = True
-try:
-    application.target_fps = 60
-except Exception:
-    pass
+BENCHMARK = next((a[len('--bench-'):] for a in sys.argv[1:] if a.startswith('--bench-')), None)
+BENCH_ARGS = dict(a[2:].split('=', 1) for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+# Workers started with spawn (Windows, macOS) import this file again to
+# reach the chunk builders; only the process we were run as opens the
+# window and builds the UI
+MAIN_PROCESS = __name__ == '__main__'
+if MAIN_PROCESS:
+    app = Ursina(window_type='offscreen' if BENCHMARK else 'onscreen')
+    window.title = 'Cavegame 1.0'
+    if not BENCHMARK:
+        window.borderless = False
+        window.fullscreen = False
+        window.vsync = True
+    try:
+        application.target_fps = 60
+    except Exception:
+        pass
 
 # ---------- Global state ----------
 random.seed(2009)
@@ -28,17 +54,54 @@ game_started = False
 current_block_type = 'grass'
 flying = False
 
-# World dimensions (classic small world)
-WORLD_X = 64
-WORLD_Y = 32
-WORLD_Z = 64
-WORLD_ORIGIN = (-WORLD_X // 2, 0, -WORLD_Z // 2)
+# Player physics: 'grid' resolves the player's box against the block array
+# (no colliders needed); 'collider' is the stock FirstPersonController
+# raycasting against chunk MeshColliders.
+PLAYER_PHYSICS = 'grid'
+
+# World dimensions. The world is streamed in CHUNK_SIZE^3 chunks around the
+# player and is unbounded in x/z; only the height is fixed. Benchmarks can
+# set it with --size=XxYxZ (Y a multiple of CHUNK_SIZE).
+CHUNK_SIZE = 16
+
+def parse_size(text):
+    # --size in blocks: Y is the world height, in whole chunks; X and Z are
+    # rounded up to whole chunks, and the size used is reported
+    try:
+        sx, sy, sz = (int(n) for n in text.split('x'))
+    except ValueError:
+        sys.exit(f'--size={text}: expected XxYxZ in blocks, e.g. --size=64x32x64')
+    if min(sx, sy, sz) <= 0:
+        sys.exit(f'--size={text}: every dimension must be positive')
+    if sy % CHUNK_SIZE:
+        sys.exit(f'--size={text}: Y is the world height and must be a multiple of the '
+                 f'chunk size ({CHUNK_SIZE}), e.g. {max(1, round(sy / CHUNK_SIZE)) * CHUNK_SIZE}')
+    size = (-(-sx // CHUNK_SIZE) * CHUNK_SIZE, sy, -(-sz // CHUNK_SIZE) * CHUNK_SIZE)
+    if size != (sx, sy, sz) and MAIN_PROCESS:
+        print(f'--size={text}: X and Z rounded up to whole chunks, using {"x".join(map(str, size))}')
+    return size
+
+BENCH_SIZE = parse_size(BENCH_ARGS['size']) if 'size' in BENCH_ARGS else None
+WORLD_Y = BENCH_SIZE[1] if BENCH_SIZE else 32
+WORLD_ORIGIN = (-32, 0, -32)    # world position of index (0,0,0)
+TREE_SEED = 1337
 
-# Occupancy and entities
-solid = None            # 3D boolean array [x][y][z] for solid blocks
-block_type = None       # 3D char array for block id
-entities = {}           # (x,y,z) world-space -> Voxel entity (only for visible surface)
-AIR = '\0'
+# Streaming: chunk columns within LOAD_RADIUS of the player's column are kept
+# loaded. New chunks are generated and meshed by WORKERS background processes
+# and uploaded by scheduler jobs as they finish. Chunks past UNLOAD_RADIUS move to an LRU capped
+# at CHUNK_CACHE_BYTES; edited chunks that fall out of it are kept
+# zlib-compressed so edits survive.
+LOAD_RADIUS = 3
+UNLOAD_RADIUS = LOAD_RADIUS + 1
+CHUNK_CACHE_BYTES = 8 * 2**20
+WORKERS = max(1, (os.cpu_count() or 2) - 1)
+MAX_PENDING_JOBS = 2 * WORKERS
+
+# Occupancy
+chunks = {}                     # (cx,cy,cz) -> PaletteChunk of block ids (AIR = empty)
+chunk_cache = OrderedDict()     # recently unloaded chunks, oldest first
+saved_chunks = {}               # evicted edited chunks, zlib-compressed
+edited_chunks = set()           # chunks that differ from the generator
 
 # ---------- Block palette ----------
 BLOCKS = {
@@ -48,22 +111,247 @@ BLOCKS = {
     'wood': color.rgb(102, 74, 50),
     'leaves': color.rgba(70, 130, 70, 220),
     'glass': color.rgba(170, 220, 255, 120),
+    'sand': color.rgb(219, 206, 150),
 }
 
-PALETTE_KEYS = ['grass', 'dirt', 'stone', 'wood', 'leaves', 'glass']
+PALETTE_KEYS = ['grass', 'dirt', 'stone', 'wood', 'leaves', 'glass', 'sand']
+
+# Block ids stored in `chunks`; id 0 is air
+AIR = 0
+BLOCK_NAMES = ['air'] + PALETTE_KEYS
+BLOCK_IDS = {name: i for i, name in enumerate(BLOCK_NAMES)}
+
+# Block-property table, indexed by block id
+BLOCK_SOLID = np.array([name != 'air' for name in BLOCK_NAMES], dtype=bool)
+# Blocks you can't see through
+BLOCK_OPAQUE = np.array([name not in ('air', 'leaves', 'glass') for name in BLOCK_NAMES], dtype=bool)
 
 # ---------- UI: FPS display ----------
-fps_text = Text(text='FPS: --', position=(-.875, .475), origin=(0,0), scale=0.9, color=color.azure, enabled=False)
-reticle = Entity(model='quad', color=color.white, parent=camera.ui, scale=.01, rotation_z=45, enabled=False)
-palette_text = Text(text='[1]Grass [2]Dirt [3]Stone [4]Wood [5]Leaves [6]Glass | F=Fly', position=(-.88, -.47), origin=(0,0), scale=.8, color=color.white, enabled=False)
+if MAIN_PROCESS:
+    fps_text = Text(text='FPS: --', position=(-.87, .475), origin=(-.5,0), scale=0.9, color=color.azure, enabled=False)
+    reticle = Entity(model='quad', color=color.white, parent=camera.ui, scale=.01, rotation_z=45, enabled=False)
+    hover_box = Entity(model='wireframe_cube', color=color.azure, scale=1.01, enabled=False)
+    palette_text = Text(text='[1]Grass [2]Dirt [3]Stone [4]Wood [5]Leaves [6]Glass [7]Sand | F=Fly M=Mesher B=Box X=Carve R=Replace F3=Profiler', position=(-.88, -.47), origin=(0,0), scale=.8, color=color.white, enabled=False)
+
+# Setting a Text rebuilds all its glyphs, so the overlay texts change a few
+# times a second rather than every frame
+TEXT_REFRESH_SECONDS = .25
+label_frames = 0        # frames since the label was last set
+label_seconds = 0.0     # and their total length
 
 def update_fps_label():
-    if time.dt > 0:
-        fps_text.text = f'FPS: {int(1 / max(time.dt, 1e-6))}'
+    # Counts the frame; sets the label, with the mean FPS since the last
+    # time, every TEXT_REFRESH_SECONDS. Returns True when it did.
+    global label_frames, label_seconds
+    label_frames += 1
+    label_seconds += time.dt
+    if label_seconds >= TEXT_REFRESH_SECONDS:
+        fps = label_frames / label_seconds
+        label_frames, label_seconds = 0, 0.0
+        # Scene nodes vs. chunk meshes actually submitted for drawing: an
+        # opaque and a see-through pass per chunk, where it has faces of each
+        draws = sum((ent.model is not None) + (key in chunk_alpha)
+                    for key, ent in chunk_entities.items() if key in drawn_chunks)
+        verts = sum(n for key, n in chunk_vertex_counts.items() if key in drawn_chunks)
+        lod_verts = sum(n for column, n in lod_vertex_counts.items() if column in drawn_lods)
+        kb = sum(c.nbytes for c in chunks.values()) // 1024
+        fps_text.text = (f'FPS: {int(fps)}  nodes: {len(scene.entities)}  '
+                         f'chunk draws: {draws}  culled: {culled_chunks} ({occluded_chunks} occluded)  '
+                         f'verts: {verts} ({mesher}) + {lod_verts} LOD ({len(drawn_lods)} cols)  '
+                         f'loaded: {len(chunks)} ({kb} KB)  '
+                         f'jobs: {len(pending_chunks)} workers, {len(scheduled_jobs)} queued  '
+                         f'ticks: {len(tick_due)} pending')
+        return True
+    return False
+
+# ---------- Frame profiler ----------
+# Every frame goes into a ring buffer: its length plus the phases this file
+# times itself (input(), the rest of update() and the player's movement,
+# streaming/scheduler/tick work in update()) and the render pass, timed by tasks either side of Panda's
+# igLoop. Whatever is left (entity updates, the frame cap) is 'other'. F3
+# shows it as an overlay; F4 writes the last PROFILE_DUMP_SECONDS to a CSV.
+PROFILE_FRAMES = 4096           # ring buffer rows, over a minute at 60 FPS
+PROFILE_GRAPH_FRAMES = 240
+PROFILE_GRAPH_MS = 50           # frame time at the top of the graph
+PROFILE_GRAPH_SIZE = (.5, .15)  # UI units
+PROFILE_DUMP_SECONDS = 30
+PROFILE_PHASES = ('input', 'update', 'jobs', 'render')
+PROFILE_COLUMNS = ('time_s', 'frame_ms') + tuple(f'{p}_ms' for p in PROFILE_PHASES)
+
+profile_ring = np.zeros((PROFILE_FRAMES, len(PROFILE_COLUMNS)))
+profile_count = 0               # frames recorded so far
+phase_ms = dict.fromkeys(PROFILE_PHASES, 0.0)   # the frame in progress
+render_start = frame_end = None
+
+if MAIN_PROCESS:
+    profiler_text = Text(text='', position=(-.87, .45), origin=(-.5, .5), scale=.8, color=color.white,
+                         background=True, enabled=False)
+    profiler_graph = Entity(parent=camera.ui, position=(-.87, .12), enabled=False)
+    Entity(parent=profiler_graph, model='quad', origin=(-.5, -.5), scale=PROFILE_GRAPH_SIZE, color=color.black66)
+    # Reference lines at 60 and 30 FPS
+    for ms, line_color in ((1000 / 60, color.lime), (1000 / 30, color.orange)):
+        Entity(parent=profiler_graph, model='quad', origin=(-.5, 0), color=line_color,
+               position=(0, ms / PROFILE_GRAPH_MS * PROFILE_GRAPH_SIZE[1]), scale=(PROFILE_GRAPH_SIZE[0], .002))
+    profiler_line = Entity(parent=profiler_graph, color=color.azure,
+                           model=Mesh(vertices=np.zeros(6, dtype=np.float32), mode='line', thickness=2, static=False))
+
+def profile_phase(name, start):
+    # Charge the time since `start` to a phase; returns now, to chain phases
+    now = time.perf_counter()
+    phase_ms[name] += (now - start) * 1000
+    return now
+
+def profile_render_start(task):
+    global render_start
+    render_start = time.perf_counter()
+    return task.cont
+
+def profile_frame_end(task):
+    # After igLoop: the frame is complete, record it
+    global profile_count, frame_end
+    now = time.perf_counter()
+    if render_start is not None:
+        phase_ms['render'] = (now - render_start) * 1000
+    if frame_end is not None:
+        profile_ring[profile_count % PROFILE_FRAMES] = (now, (now - frame_end) * 1000,
+                                                       *(phase_ms[p] for p in PROFILE_PHASES))
+        profile_count += 1
+    frame_end = now
+    phase_ms.update(dict.fromkeys(PROFILE_PHASES, 0.0))
+    return task.cont
+
+if MAIN_PROCESS:
+    app.taskMgr.add(profile_render_start, 'profile_render_start', sort=49)
+    app.taskMgr.add(profile_frame_end, 'profile_frame_end', sort=51)
+
+def profile_rows(seconds=None):
+    # Recorded frames, oldest first, optionally only the last `seconds`
+    if profile_count <= PROFILE_FRAMES:
+        rows = profile_ring[:profile_count]
+    else:
+        rows = np.roll(profile_ring, -(profile_count % PROFILE_FRAMES), axis=0)
+    if seconds is not None and len(rows):
+        rows = rows[rows[:, 0] > rows[-1, 0] - seconds]
+    return rows
+
+def frame_lows(frame_ms):
+    # FPS averaged over the slowest 1% and 0.1% of frames
+    worst = np.sort(frame_ms)[::-1]
+    return [1000 / worst[:max(1, len(worst) // n)].mean() for n in (100, 1000)]
+
+def update_profiler(text=True):
+    # The graph every frame, into the same mesh; the text only if `text`
+    rows = profile_rows()
+    if not len(rows):
+        return
+    w, h = PROFILE_GRAPH_SIZE
+    graph = rows[-PROFILE_GRAPH_FRAMES:, 1]
+    points = np.zeros((len(graph), 3), dtype=np.float32)
+    points[:, 0] = np.arange(len(graph)) * (w / PROFILE_GRAPH_FRAMES)
+    points[:, 1] = np.minimum(graph / PROFILE_GRAPH_MS, 1) * h
+    profiler_line.model.vertices = points.ravel()
+    profiler_line.model.generate()
+    if not text:
+        return
+
+    second = profile_rows(1)
+    frame, *phases = second[:, 1:].mean(axis=0)
+    low1, low01 = frame_lows(rows[:, 1])
+    split = '  '.join(f'{p} {ms:.2f}' for p, ms in zip(PROFILE_PHASES, phases))
+    verts = sum(n for key, n in chunk_vertex_counts.items() if key in drawn_chunks)
+    lod_verts = sum(n for column, n in lod_vertex_counts.items() if column in drawn_lods)
+    profiler_text.text = (
+        f'frame {frame:.2f} ms ({1000 / frame:.0f} FPS)  1% low {low1:.0f}  0.1% low {low01:.0f} FPS  '
+        f'(last {len(rows)} frames)\n'
+        f'{split}  other {frame - sum(phases):.2f} ms  (mean, last second)\n'
+        f'entities {len(scene.entities)}  chunks {len(chunks)} loaded, {len(drawn_chunks)} drawn  '
+        f'verts {verts} + {lod_verts} LOD\n'
+        f'pending: {len(pending_chunks)} builds, {len(scheduled_jobs)} jobs, {len(dirty_chunks)} dirty, '
+        f'{len(tick_due)} ticks\n'
+        f'F4: write the last {PROFILE_DUMP_SECONDS} s to CSV')
+
+def toggle_profiler():
+    on = not profiler_text.enabled
+    profiler_text.enabled = profiler_graph.enabled = on
+
+def dump_profile(seconds=PROFILE_DUMP_SECONDS, path=None):
+    # One row per frame, time in seconds from the first; returns the path
+    rows = profile_rows(seconds).copy()
+    if len(rows):
+        rows[:, 0] -= rows[0, 0]
+    path = path or f'cavegame-profile-{time.strftime("%Y%m%d-%H%M%S")}.csv'
+    np.savetxt(path, rows, fmt='%.3f', delimiter=',', header=','.join(PROFILE_COLUMNS), comments='')
+    print_on_screen(f'Wrote {len(rows)} frames to {path}', position=(-.2, .3), duration=3)
+    return path
+
+# ---------- Chunk storage ----------
+class PaletteChunk:
+    """CHUNK_SIZE^3 block ids as a local palette plus bit-packed indices.
+
+    Cell (x, y, z) is index number (x*CS + y)*CS + z, packed at 0, 1, 2, 4
+    or 8 bits each, low bits first; 0 bits means the whole chunk is
+    palette[0]. Most chunks hold 2-4 block types, a quarter of a byte array.
+    """
+    __slots__ = ('palette', 'bits', 'data')
+
+    def __init__(self, palette, data=None):
+        self.palette = palette      # list of block ids
+        self.bits = next(b for b in (0, 1, 2, 4, 8) if len(palette) <= 1 << b)
+        self.data = data if data is not None else bytearray()
+
+    @classmethod
+    def from_array(cls, arr):
+        palette, index = np.unique(arr.ravel(), return_inverse=True)
+        chunk = cls(palette.tolist())
+        if chunk.bits:
+            per_byte = 8 // chunk.bits
+            shifts = np.arange(per_byte, dtype=np.uint8) * chunk.bits
+            packed = np.bitwise_or.reduce(index.astype(np.uint8).reshape(-1, per_byte) << shifts, axis=1)
+            chunk.data = bytearray(packed.astype(np.uint8).tobytes())
+        return chunk
+
+    def to_array(self):
+        if not self.bits:
+            return np.full((CHUNK_SIZE,) * 3, self.palette[0], dtype=np.uint8)
+        per_byte = 8 // self.bits
+        shifts = np.arange(per_byte, dtype=np.uint8) * self.bits
+        index = (np.frombuffer(self.data, dtype=np.uint8)[:, None] >> shifts) & ((1 << self.bits) - 1)
+        return np.array(self.palette, dtype=np.uint8)[index.reshape((CHUNK_SIZE,) * 3)]
+
+    @property
+    def nbytes(self):
+        return len(self.data) + len(self.palette)
+
+    def get(self, x, y, z):
+        if not self.bits:
+            return self.palette[0]
+        i = ((x * CHUNK_SIZE + y) * CHUNK_SIZE + z) * self.bits
+        return self.palette[self.data[i >> 3] >> (i & 7) & ((1 << self.bits) - 1)]
+
+    def set(self, x, y, z, block_id):
+        if not self.bits and block_id == self.palette[0]:
+            return  # already uniformly this block; there is no data to write
+        if block_id not in self.palette:
+            if len(self.palette) == 1 << self.bits:
+                # Out of indices: repack wider (this also drops unused entries)
+                arr = self.to_array()
+                arr[x, y, z] = block_id
+                wider = PaletteChunk.from_array(arr)
+                self.palette, self.bits, self.data = wider.palette, wider.bits, wider.data
+                return
+            self.palette.append(block_id)
+        i = ((x * CHUNK_SIZE + y) * CHUNK_SIZE + z) * self.bits
+        shift = i & 7
+        mask = ((1 << self.bits) - 1) << shift
+        self.data[i >> 3] = (self.data[i >> 3] & ~mask) | (self.palette.index(block_id) << shift)
 
 # ---------- Helpers: index mapping ----------
+def chunk_of(ix, iy, iz):
+    return (ix // CHUNK_SIZE, iy // CHUNK_SIZE, iz // CHUNK_SIZE)
+
 def in_bounds(ix, iy, iz):
-    return 0 <= ix < WORLD_X and 0 <= iy < WORLD_Y and 0 <= iz < WORLD_Z
+    # Within the world's height and in a loaded chunk
+    return 0 <= iy < WORLD_Y and chunk_of(ix, iy, iz) in chunks
 
 def to_world(ix, iy, iz):
     ox, oy, oz = WORLD_ORIGIN
@@ -73,218 +361,1964 @@ def to_index(wx, wy, wz):
     ox, oy, oz = WORLD_ORIGIN
     return (wx - ox, wy - oy, wz - oz)
 
+def get_block(ix, iy, iz):
+    # Unloaded or out-of-height cells read as air
+    chunk = chunks.get(chunk_of(ix, iy, iz)) if 0 <= iy < WORLD_Y else None
+    if chunk is None:
+        return AIR
+    return chunk.get(ix % CHUNK_SIZE, iy % CHUNK_SIZE, iz % CHUNK_SIZE)
+
+def is_solid(ix, iy, iz):
+    return BLOCK_SOLID[get_block(ix, iy, iz)]
+
+# ---------- Heightmap ----------
+# Per chunk, the local y of the highest solid cell in each (x, z) column, or
+# -1 where the column is empty in that chunk. Looking down a column of
+# chunks gives the world's top-solid height without scanning blocks.
+chunk_tops = {}     # (cx,cy,cz) -> (CHUNK_SIZE, CHUNK_SIZE) int8
+
+def solid_tops(blocks):
+    # Highest solid y per (x, z) of a block array, -1 where there is none
+    solid = BLOCK_SOLID[blocks]
+    top = blocks.shape[1] - 1 - np.argmax(solid[:, ::-1], axis=1)
+    return np.where(solid.any(axis=1), top, -1).astype(np.int8)
+
+def column_top(ix, iz):
+    # Index y of the highest solid block in a column: -1 if it has none,
+    # None while part of the column isn't loaded
+    cx, cz = ix // CHUNK_SIZE, iz // CHUNK_SIZE
+    x, z = ix % CHUNK_SIZE, iz % CHUNK_SIZE
+    for cy in reversed(range(WORLD_Y // CHUNK_SIZE)):
+        tops = chunk_tops.get((cx, cy, cz))
+        if tops is None:
+            return None
+        if tops[x, z] >= 0:
+            return cy * CHUNK_SIZE + int(tops[x, z])
+    return -1
+
+def update_top(ix, iy, iz):
+    # Keep chunk_tops current after the block at (ix, iy, iz) changed
+    key = chunk_of(ix, iy, iz)
+    tops = chunk_tops[key]
+    x, y, z = ix % CHUNK_SIZE, iy % CHUNK_SIZE, iz % CHUNK_SIZE
+    if is_solid(ix, iy, iz):
+        tops[x, z] = max(tops[x, z], y)
+    elif tops[x, z] == y:
+        # The top was removed; only this chunk's cells below it can be next
+        chunk = chunks[key]
+        tops[x, z] = next((ly for ly in reversed(range(y)) if BLOCK_SOLID[chunk.get(x, ly, z)]), -1)
+
+# ---------- Lighting ----------
+# Skylight, 0..MAX_LIGHT per cell. Cells above a column's top solid block
+# see the sky; light then spreads through every see-through cell, one level
+# dimmer per step. New chunks are lit in bulk (relaxation over a box padded
+# by LIGHT_MARGIN, so the result is exact); edits relight only the cells
+# whose light can change, breadth-first. Meshing bakes the light into the
+# vertex colours, so it costs nothing per frame.
+MAX_LIGHT = 15
+# Light travels at most MAX_LIGHT cells, so a chunk and its 1-cell border
+# light exactly from a box MAX_LIGHT + 1 wider; we use one chunk column
+LIGHT_MARGIN = CHUNK_SIZE
+chunk_light = {}                # (cx,cy,cz) -> (CHUNK_SIZE,)*3 uint8
+
+def skylight(blocks, y0, fixed=None):
+    # Light for a block array whose rows start at index y `y0` and reach
+    # above the world; the sky must be inside the box. With `fixed`, the
+    # light already known on the box's x and z faces is kept as it is.
+    iy = np.arange(y0, y0 + blocks.shape[1]).reshape(1, -1, 1)
+    clear = ~BLOCK_OPAQUE[blocks] & (iy >= 0)
+    covered = np.logical_or.accumulate(BLOCK_SOLID[blocks][:, ::-1], axis=1)[:, ::-1]
+    light = np.where(clear & ~covered, MAX_LIGHT, 0).astype(np.uint8)
+    if fixed is not None:
+        shell = np.ones(blocks.shape, dtype=bool)
+        shell[1:-1, :, 1:-1] = False
+        light[shell] = fixed[shell]
+    for _ in range(MAX_LIGHT):
+        dim = np.maximum(light, 1) - 1
+        spread = light.copy()
+        for axis in range(3):
+            lo, hi = [slice(None)] * 3, [slice(None)] * 3
+            lo[axis], hi[axis] = slice(None, -1), slice(1, None)
+            lo, hi = tuple(lo), tuple(hi)
+            np.maximum(spread[lo], dim[hi], out=spread[lo])
+            np.maximum(spread[hi], dim[lo], out=spread[hi])
+        spread *= clear
+        if fixed is not None:
+            spread[shell] = fixed[shell]
+        if np.array_equal(spread, light):
+            break
+        light = spread
+    return light
+
+def light_box(key):
+    # Index box that lights a chunk exactly: the whole height of the world,
+    # LIGHT_MARGIN around it in x and z
+    lo, hi = chunk_bounds(key)
+    return ((lo[0] - LIGHT_MARGIN, -1, lo[2] - LIGHT_MARGIN),
+            (hi[0] + LIGHT_MARGIN, WORLD_Y + 1, hi[2] + LIGHT_MARGIN))
+
+def chunk_in_box(a, key):
+    # The chunk plus a 1-cell border, out of a light_box()-shaped array
+    box_lo, _ = light_box(key)
+    lo, hi = chunk_bounds(key)
+    return a[tuple(slice(l - b - 1, h - b + 1) for l, h, b in zip(lo, hi, box_lo))]
+
+def light_at(ix, iy, iz):
+    # None for cells in chunks that aren't loaded
+    if iy >= WORLD_Y:
+        return MAX_LIGHT
+    if iy < 0:
+        return 0
+    light = chunk_light.get(chunk_of(ix, iy, iz))
+    if light is None:
+        return None
+    return int(light[ix % CHUNK_SIZE, iy % CHUNK_SIZE, iz % CHUNK_SIZE])
+
+def set_light(cell, level):
+    ix, iy, iz = cell
+    chunk_light[chunk_of(ix, iy, iz)][ix % CHUNK_SIZE, iy % CHUNK_SIZE, iz % CHUNK_SIZE] = level
+
+def read_light(lo, hi, unknown=MAX_LIGHT):
+    # Light for any index box [lo, hi) from the loaded chunks; full light
+    # above the world, `unknown` in chunks that aren't loaded
+    out = np.full([h - l for l, h in zip(lo, hi)], unknown, dtype=np.uint8)
+    out[:, max(0, WORLD_Y - lo[1]):, :] = MAX_LIGHT
+    out[:, :max(0, min(hi[1], 0) - lo[1]), :] = 0
+    c0, c1 = chunk_of(*lo), chunk_of(*(h - 1 for h in hi))
+    for cx in range(c0[0], c1[0] + 1):
+        for cy in range(max(c0[1], 0), min(c1[1], WORLD_Y // CHUNK_SIZE - 1) + 1):
+            for cz in range(c0[2], c1[2] + 1):
+                light = chunk_light.get((cx, cy, cz))
+                if light is None:
+                    continue
+                clo, chi = chunk_bounds((cx, cy, cz))
+                a = [max(l, c) for l, c in zip(lo, clo)]
+                b = [min(h, c) for h, c in zip(hi, chi)]
+                dst = tuple(slice(p - l, q - l) for p, q, l in zip(a, b, lo))
+                out[dst] = light[tuple(slice(p - c, q - c) for p, q, c in zip(a, b, clo))]
+    return out
+
+def relight(ix, iy, iz, old_top):
+    """Bring chunk_light up to date after the block at (ix, iy, iz) changed.
+
+    `old_top` is the column's top before the change; every cell between it
+    and the new top changed between lit by the sky and not. Light that came
+    from those cells is cleared first, then refilled from whatever still
+    borders the cleared area. Returns the cells whose light changed.
+    """
+    new_top = column_top(ix, iz)
+    sources = {(ix, iy, iz)}
+    if old_top is not None and new_top is not None:
+        sources.update((ix, y, iz) for y in range(min(old_top, new_top) + 1, max(old_top, new_top) + 1))
+    changed = set()
+    # Darken everything that was lit through the sources
+    dark = deque()
+    for cell in sources:
+        dark.append((cell, light_at(*cell)))
+        set_light(cell, 0)
+        changed.add(cell)
+    bright = deque()
+    while dark:
+        (x, y, z), level = dark.popleft()
+        for dx, dy, dz in neighbors:
+            n = (x + dx, y + dy, z + dz)
+            nl = light_at(*n)
+            if nl is None or not 0 <= n[1] < WORLD_Y:
+                continue
+            if nl and nl < level:
+                set_light(n, 0)
+                changed.add(n)
+                dark.append((n, nl))
+            elif nl >= level:
+                bright.append(n)
+    # Relight the sources that see the sky, then spread from the border
+    for cell in sources:
+        if not BLOCK_OPAQUE[get_block(*cell)] and new_top is not None and cell[1] > new_top:
+            set_light(cell, MAX_LIGHT)
+            bright.append(cell)
+    while bright:
+        x, y, z = cell = bright.popleft()
+        level = light_at(*cell) - 1
+        if level <= 0:
+            continue
+        for dx, dy, dz in neighbors:
+            n = (x + dx, y + dy, z + dz)
+            nl = light_at(*n)
+            if nl is None or not 0 <= n[1] < WORLD_Y or nl >= level or BLOCK_OPAQUE[get_block(*n)]:
+                continue
+            set_light(n, level)
+            changed.add(n)
+            bright.append(n)
+    return changed
+
+# ---------- Noise ----------
+# Seeded gradient (Perlin) noise, evaluated over whole coordinate arrays.
+# Results are roughly in [-1, 1]. Only elementwise arithmetic, so the same
+# point gives the same bits whichever chunk asks for it.
+TERRAIN_SEED = 2009
+
+@functools.lru_cache(maxsize=None)
+def noise_tables(seed):
+    # Doubled permutation table, plus random unit gradients in 2D and 3D
+    # already looked up through it, one table per component
+    rng = np.random.default_rng(seed)
+    perm = rng.permutation(256)
+    perm = np.concatenate([perm, perm])
+    angle = rng.uniform(0, 2 * math.pi, 256)
+    grad2 = np.stack([np.cos(angle), np.sin(angle)])[:, perm]
+    grad3 = rng.normal(size=(3, 256))
+    grad3 = (grad3 / np.linalg.norm(grad3, axis=0))[:, perm]
+    return perm, grad2, grad3
+
+def fade(t):
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+def lerp(a, b, t):
+    return a + t * (b - a)
+
+# Inputs are left unbroadcast: on grid axes shaped (n,1,1), (1,m,1), (1,1,k)
+# the hashing for the first axes runs on the small arrays. The two lattice
+# corners along each dimension go on new leading axes, so all of a cell's
+# corners are hashed and dotted in one pass.
+def corner_offsets(dims, ndim):
+    # (0, 1) on each of `dims` leading axes, ahead of ndim input axes
+    return [np.arange(2).reshape((1,) * a + (2,) + (1,) * (dims - 1 - a + ndim)) for a in range(dims)]
+
+def gradient_noise2(x, z, seed):
+    perm, (gx, gz), _ = noise_tables(seed)
+    x, z = np.asarray(x, dtype=np.float64), np.asarray(z, dtype=np.float64)
+    x0, z0 = np.floor(x), np.floor(z)
+    tx, tz = x - x0, z - z0
+    dx, dz = corner_offsets(2, max(x.ndim, z.ndim))
+    h = perm[(x0.astype(np.int64) & 255) + dx] + (z0.astype(np.int64) & 255) + dz
+    n = gx[h] * (tx - dx) + gz[h] * (tz - dz)
+    n = lerp(n[0], n[1], fade(tx))
+    return lerp(n[0], n[1], fade(tz)) * math.sqrt(2)
+
+def gradient_noise3(x, y, z, seed):
+    perm, _, (gx, gy, gz) = noise_tables(seed)
+    x, y, z = (np.asarray(c, dtype=np.float64) for c in (x, y, z))
+    x0, y0, z0 = np.floor(x), np.floor(y), np.floor(z)
+    ix, iy, iz = (c.astype(np.int64) & 255 for c in (x0, y0, z0))
+    tx, ty, tz = x - x0, y - y0, z - z0
+    dx, dy, dz = corner_offsets(3, max(x.ndim, y.ndim, z.ndim))
+    h = perm[perm[ix + dx] + iy + dy] + iz + dz
+    n = gx[h] * (tx - dx) + gy[h] * (ty - dy) + gz[h] * (tz - dz)
+    n = lerp(n[0], n[1], fade(tx))
+    n = lerp(n[0], n[1], fade(ty))
+    return lerp(n[0], n[1], fade(tz)) * 1.5
+
+def fractal_noise(noise, coords, seed, octaves, lacunarity=2.0, gain=0.5):
+    # Octave k samples at lacunarity**k times the frequency with weight
+    # gain**k, shifted so the octaves' lattices don't line up. All octaves
+    # go through one noise call, stacked on a new leading axis.
+    k = np.arange(octaves).reshape((-1,) + (1,) * max(np.ndim(c) for c in coords))
+    scale = lacunarity ** k
+    stacked = noise(*(np.asarray(c) * scale + k * 17.31 for c in coords), seed=seed)
+    weight = gain ** k
+    return (stacked * weight).sum(axis=0) / weight.sum()
+
+def lattice_noise(fn, axes, step):
+    """fn sampled every `step` cells and linearly interpolated back.
+
+    `axes` are the integer axes of a grid, shaped to broadcast against each
+    other ((n,1,1), (1,m,1), ...); fn may add leading axes of its own. The
+    lattice is fixed in world space, so neighbouring boxes agree exactly.
+    """
+    dims = len(axes)
+    points, cells, weights = [], [], []
+    for a, c in enumerate(axes):
+        shape = [1] * dims
+        shape[a] = -1
+        c = np.ravel(c)
+        cell = c // step
+        points.append((np.arange(cell.min(), cell.max() + 2) * step).reshape(shape))
+        cells.append(cell - cell.min())
+        weights.append(((c - cell * step) / step).reshape(shape))
+    g = fn(*points)
+    for a in range(dims):
+        axis = g.ndim - dims + a
+        g = lerp(np.take(g, cells[a], axis=axis), np.take(g, cells[a] + 1, axis=axis), weights[a])
+    return g
+
 # ---------- Density functions ----------
+# Fields are sampled on a lattice every NOISE_STEP cells and interpolated;
+# all take the integer axes of a grid, shaped (n,1) / (1,m) or (n,1,1) ...
+NOISE_STEP = 4
+
 def height_at(x, z):
-    # Rolling hills
-    h = 8 + 4.0 * math.sin(x * 0.12) + 4.0 * math.cos(z * 0.10) + 2.0 * math.sin((x+z) * 0.07)
-    return int(clamp(h, 4, WORLD_Y-3))
+    # Fractal hills
+    def hills(px, pz):
+        return fractal_noise(gradient_noise2, (px * 0.015, pz * 0.015), TERRAIN_SEED, octaves=4)
+    return np.clip(11 + 14 * lattice_noise(hills, (x, z), NOISE_STEP), 4, WORLD_Y - 3).astype(int)
+
+def cave_fields(x, y, z):
+    # Two unrelated 3D fields, stacked; the second is the first far away
+    offset = np.array([0.0, 1000.5]).reshape(2, 1, 1, 1)
+    return fractal_noise(gradient_noise3, (x * 0.045 + offset, y * 0.07, z * 0.045),
+                         TERRAIN_SEED + 1, octaves=2)
 
 def cave_value(x, y, z):
-    # Cave-like 3D field, repeatable and cheap
-    return (
-        math.sin(x * 0.22) + math.cos(z * 0.21) +
-        math.sin(y * 0.29) + math.sin((x + z - y) * 0.13)
-    )
+    # On grid axes x, y, z; tunnels follow the lines where both fields are
+    # near zero
+    a, b = lattice_noise(cave_fields, (x, y, z), NOISE_STEP)
+    return np.maximum(np.abs(a), np.abs(b))
 
 def is_cave(x, y, z):
-    # Threshold carves tunnels; lower -> more caves
-    v = cave_value(x, y, z)
-    return -0.7 < v < 0.35 and y <= WORLD_Y - 6
+    # Threshold carves tunnels; higher -> wider caves
+    return (cave_value(x, y, z) < 0.12) & (y <= WORLD_Y - 6)
 
 # ---------- World generation ----------
-def gen_world_arrays():
-    global solid, block_type
-    solid = [[[False for _ in range(WORLD_Z)] for _ in range(WORLD_Y)] for _ in range(WORLD_X)]
-    block_type = [[[AIR for _ in range(WORLD_Z)] for _ in range(WORLD_Y)] for _ in range(WORLD_X)]
-
-    for ix in range(WORLD_X):
-        for iz in range(WORLD_Z):
-            wx, wz = to_world(ix, 0, iz)[0], to_world(ix, 0, iz)[2]
-            h = height_at(wx, wz)
-            for iy in range(h):
-                wy = iy
-                # Stone base, dirt mid, grass top
-                if iy == h - 1:
-                    t = 'grass'
-                elif iy >= h - 3:
-                    t = 'dirt'
+# Everything is a pure function of index coordinates, so any chunk can be
+# generated on its own and comes out the same every time.
+def hash01(x, y, z, salt):
+    # Per-cell pseudo-random value in [0, 1); vectorised over array coordinates
+    with np.errstate(over='ignore'):
+        h = (np.asarray(x, dtype=np.int64).astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+             ^ np.asarray(y, dtype=np.int64).astype(np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F)
+             ^ np.asarray(z, dtype=np.int64).astype(np.uint64) * np.uint64(0x165667B19E3779F9)
+             ^ np.uint64(salt))
+        h = (h ^ (h >> np.uint64(31))) * np.uint64(0xBF58476D1CE4E5B9)
+        h = (h ^ (h >> np.uint64(29))) * np.uint64(0x94D049BB133111EB)
+        h ^= h >> np.uint64(32)
+    return (h >> np.uint64(11)).astype(np.float64) / 2.0**53
+
+def generate_region(lo, hi):
+    # Block ids for the index box [lo, hi): terrain, caves and trees
+    (x0, y0, z0), (x1, y1, z1) = lo, hi
+    ox, oy, oz = WORLD_ORIGIN
+    iy = np.arange(y0, y1).reshape(1, -1, 1)
+    wx = np.arange(x0, x1).reshape(-1, 1, 1) + ox
+    wy = iy + oy
+    wz = np.arange(z0, z1).reshape(1, 1, -1) + oz
+    # Surface heights, with a margin for trees rooted just outside the box
+    r = TREE_REACH
+    heights = height_at(np.arange(x0 - r, x1 + r).reshape(-1, 1) + ox,
+                        np.arange(z0 - r, z1 + r).reshape(1, -1) + oz)
+    h = heights[r:-r, None, r:-r]
+
+    # Stone base, dirt mid, grass top; caves below surface
+    layer = np.where(iy == h - 1, BLOCK_IDS['grass'],
+                     np.where(iy >= h - 3, BLOCK_IDS['dirt'], BLOCK_IDS['stone']))
+    filled = iy < h
+    # Caves only need evaluating up to the highest underground row
+    underground = iy <= h - 2
+    rows = int(underground.any(axis=(0, 2)).sum())
+    if rows:
+        filled[:, :rows] &= ~(underground[:, :rows] & is_cave(wx, wy[:, :rows], wz))
+    region = np.where(filled, layer, AIR).astype(np.uint8)
+    plant_trees(region, lo, hi, heights)
+    # Nothing exists above or below the world, including tree tops
+    region[:, ((iy < 0) | (iy >= WORLD_Y)).ravel(), :] = AIR
+    return region
+
+# Leaf blob around the top of a trunk
+TREE_REACH = 2
+LEAF_OFFSETS = np.array([(dx, dy, dz)
+                         for dx in range(-2, 3) for dy in range(-2, 3) for dz in range(-2, 3)
+                         if abs(dx) + abs(dy) + abs(dz) <= 4])
+
+def plant_trees(region, lo, hi, heights):
+    # ~1.3% of grass columns grow a tree (what the old 2% pass ended up with
+    # after skipping columns already under leaves). Columns just outside the
+    # region can still reach into it with leaves, so `heights` covers the
+    # box plus TREE_REACH on each side. Trees are placed in (x, z) order, so
+    # overlapping trees resolve the same way in every chunk.
+    (x0, _, z0), (x1, _, z1) = lo, hi
+    tx = np.arange(x0 - TREE_REACH, x1 + TREE_REACH).reshape(-1, 1)
+    tz = np.arange(z0 - TREE_REACH, z1 + TREE_REACH).reshape(1, -1)
+    xs, zs = np.nonzero(hash01(tx, 0, tz, TREE_SEED) < 0.013)
+    if not len(xs):
+        return
+    # The terrain surface is always grass; the trunk starts right above it
+    ix, iy, iz = xs + x0 - TREE_REACH, heights[xs, zs], zs + z0 - TREE_REACH
+    height = 3 + (hash01(ix, iy, iz, TREE_SEED + 1) * 3).astype(int)
+    # Every tree's cells in one batch: up to 5 trunk cells, then the leaf
+    # blob around the top of the trunk
+    dy = np.arange(5)
+    trunk = np.stack(np.broadcast_arrays(ix[:, None], iy[:, None] + dy, iz[:, None]), axis=-1)
+    leaves = LEAF_OFFSETS + np.stack([ix, iy + height - 1, iz], axis=1)[:, None]
+    cells = np.concatenate([trunk, leaves], axis=1)
+    keep = np.concatenate([dy < height[:, None],
+                           hash01(leaves[..., 0], leaves[..., 1], leaves[..., 2], TREE_SEED + 2) < 0.92], axis=1)
+    ids = np.where(np.arange(cells.shape[1]) < len(dy), BLOCK_IDS['wood'], BLOCK_IDS['leaves'])
+    place_in_region(region, lo, cells[keep], np.broadcast_to(ids, keep.shape)[keep])
+
+def place_in_region(region, lo, cells, block_ids):
+    # Fill the air cells among `cells` (n, 3) that fall inside `region`;
+    # where several land on one cell, the first of them wins
+    local = cells - lo
+    inside = np.all((local >= 0) & (local < region.shape), axis=1)
+    index, first = np.unique(np.ravel_multi_index(tuple(local[inside].T), region.shape), return_index=True)
+    current = region.flat[index]
+    region.flat[index] = np.where(current == AIR, block_ids[inside][first], current)
+
+def place_array(ix, iy, iz, t, overwrite_air_only=True):
+    # Write one block into the loaded world; returns True if it changed
+    if not in_bounds(ix, iy, iz):
+        return False
+    if overwrite_air_only and is_solid(ix, iy, iz):
+        return False
+    key = chunk_of(ix, iy, iz)
+    old_top = column_top(ix, iz)
+    old_id = get_block(ix, iy, iz)
+    chunks[key].set(ix % CHUNK_SIZE, iy % CHUNK_SIZE, iz % CHUNK_SIZE, BLOCK_IDS[t])
+    edited_chunks.add(key)
+    stale_connectivity.add(key)
+    update_top(ix, iy, iz)
+    mark_block_dirty(ix, iy, iz)
+    mark_light_dirty(list(relight(ix, iy, iz, old_top)))
+    wake_neighbours(ix, iy, iz, old_id)
+    return True
+
+# ---------- Surface extraction ----------
+neighbors = [(1,0,0),(-1,0,0),(0,1,0),(0,-1,0),(0,0,1),(0,0,-1)]
+
+# ---------- Chunk meshes ----------
+# The world is drawn as one combined Mesh per chunk holding only the faces
+# that border air, instead of one entity per exposed block.
+chunk_entities = {}     # (cx,cy,cz) -> Entity with that chunk's surface mesh
+chunk_vertex_counts = {}
+
+# Every block type shares one texture and differs only in vertex colour, so
+# a chunk's opaque faces are a single draw with no blending. See-through
+# faces (glass, leaves) go in a second mesh, a child of the opaque one, drawn
+# afterwards in Panda's 'transparent' bin, which orders the chunks back to
+# front. Inside a chunk the quads are ordered back to front for the camera
+# cell they were last sorted for; chunks near the camera are resorted when
+# it moves to another cell.
+CHUNK_TEXTURE = load_texture('white_cube') if MAIN_PROCESS else None
+chunk_alpha = {}        # (cx,cy,cz) -> (Entity, world-space quad centres, camera cell sorted for)
+ALPHA_SORT_RADIUS = 1   # in chunks
+
+# A block at world (x,y,z) spans this corner to corner + 1 (cube with origin_y=.5)
+VOXEL_MIN_CORNER = Vec3(-.5, -1, -.5)
+
+# Face directions as (axis, sign), in the same order as `neighbors`
+FACE_DIRS = [(0, 1), (0, -1), (1, 1), (1, -1), (2, 1), (2, -1)]
+QUAD_INDICES = np.array([0, 1, 2, 2, 3, 0], dtype=np.uint32)
+
+# Vertex colors, indexed by block id. Newer Ursina versions keep the 0-255
+# values passed to color.rgb()/rgba() as-is, so scale those down.
+BLOCK_COLORS = np.array([tuple(color.clear)] + [tuple(BLOCKS[k]) for k in PALETTE_KEYS], dtype=np.float32)
+BLOCK_COLORS[BLOCK_COLORS > 1] /= 255
+
+# Baked shading: brightness per skylight level (never fully black, so caves
+# stay readable) and per ambient-occlusion level of a corner, 0 = boxed in
+LIGHT_SHADE = np.maximum(0.82 ** (MAX_LIGHT - np.arange(MAX_LIGHT + 1)), 0.12).astype(np.float32)
+AO_SHADE = np.array([0.55, 0.7, 0.85, 1.0], dtype=np.float32)
+
+# Faces are meshed by a key packing everything their vertex colours depend
+# on, so greedy merging only joins faces that shade the same:
+# block id | light << 8 | corner k's AO << (12 + 2k)
+FACE_LIGHT_SHIFT = 8
+FACE_AO_SHIFT = 12
+# Quad corners in (u, v) tangent steps, in build_quad_arrays' order
+QUAD_CORNERS = ((0, 0), (1, 0), (1, 1), (0, 1))
+
+def chunk_bounds(key):
+    # Index-space [lo, hi) box of a chunk
+    lo = tuple(c * CHUNK_SIZE for c in key)
+    return lo, tuple(l + CHUNK_SIZE for l in lo)
+
+def stored_chunk(key):
+    # Block id array for a chunk we hold in any form, without loading it
+    chunk = chunks.get(key)
+    if chunk is None:
+        chunk = chunk_cache.get(key)
+    if chunk is not None:
+        return chunk.to_array()
+    if key in saved_chunks:
+        arr = np.frombuffer(zlib.decompress(saved_chunks[key]), dtype=np.uint8)
+        return arr.reshape((CHUNK_SIZE,) * 3)
+    return None
+
+def read_region(lo, hi):
+    # Block ids for any index box [lo, hi): stored chunk data where we have
+    # it, the generator everywhere else
+    out = np.zeros([h - l for l, h in zip(lo, hi)], dtype=np.uint8)
+    y0, y1 = max(lo[1], 0), min(hi[1], WORLD_Y)
+    if y0 >= y1:
+        return out
+    c0 = chunk_of(lo[0], y0, lo[2])
+    c1 = chunk_of(hi[0] - 1, y1 - 1, hi[2] - 1)
+    for cx in range(c0[0], c1[0] + 1):
+        for cy in range(c0[1], c1[1] + 1):
+            for cz in range(c0[2], c1[2] + 1):
+                key = (cx, cy, cz)
+                clo, chi = chunk_bounds(key)
+                a = tuple(max(l, c) for l, c in zip(lo, clo))
+                b = tuple(min(h, c) for h, c in zip(hi, chi))
+                dst = tuple(slice(p - l, q - l) for p, q, l in zip(a, b, lo))
+                arr = stored_chunk(key)
+                if arr is None:
+                    out[dst] = generate_region(a, b)
                 else:
-                    t = 'stone'
-                # Caves below surface
-                if iy <= h - 2 and is_cave(wx, wy, wz):
+                    out[dst] = arr[tuple(slice(p - c, q - c) for p, q, c in zip(a, b, clo))]
+    return out
+
+def padded_chunk(key):
+    # The chunk plus a one-cell border from its neighbours; meshers only
+    # ever look at this array, so they also run in worker processes
+    lo, hi = chunk_bounds(key)
+    return read_region(tuple(l - 1 for l in lo), tuple(h + 1 for h in hi))
+
+def padded_light(key):
+    lo, hi = chunk_bounds(key)
+    return read_light(tuple(l - 1 for l in lo), tuple(h + 1 for h in hi))
+
+def world_light(key):
+    # Light a chunk from the world as we hold it (stored chunks, the
+    # generator elsewhere) rather than from the generator alone
+    return chunk_in_box(skylight(read_region(*light_box(key)), -1), key)[1:-1, 1:-1, 1:-1]
+
+def build_quad_arrays(quads):
+    """Turn (axis, sign, x, y, z, w, h, face_key) quads into packed mesh arrays.
+
+    (x,y,z) is the chunk-local cell the face belongs to, w/h its extent along
+    the two tangent axes (axis+1, axis+2). Winding faces outward.
+    """
+    q = np.array(quads, dtype=np.int32).reshape(-1, 8)
+    axis, sign, pos, w, h, key = q[:, 0], q[:, 1], q[:, 2:5], q[:, 5], q[:, 6], q[:, 7]
+    n = len(q)
+    unit = np.eye(3, dtype=np.float32)
+    base = pos + (sign > 0)[:, None] * unit[axis]
+    du = unit[(axis + 1) % 3] * w[:, None]
+    dv = unit[(axis + 2) % 3] * h[:, None]
+    corners = np.stack([base, base + du, base + du + dv, base + dv], axis=1)
+    uvs = np.zeros((n, 4, 2), dtype=np.float32)
+    uvs[:, 1, 0] = uvs[:, 2, 0] = w
+    uvs[:, 2, 1] = uvs[:, 3, 1] = h
+    ao = (key[:, None] >> (FACE_AO_SHIFT + 2 * np.arange(4))) & 3
+    shade = LIGHT_SHADE[(key >> FACE_LIGHT_SHIFT) & 15][:, None] * AO_SHADE[ao]
+    colors = np.repeat(BLOCK_COLORS[key & 255][:, None], 4, axis=1)
+    colors[..., :3] *= shade[..., None]
+    # Positive faces run the other way round
+    flip = sign > 0
+    corners[flip] = corners[flip][:, [0, 3, 2, 1]]
+    uvs[flip] = uvs[flip][:, [0, 3, 2, 1]]
+    colors[flip] = colors[flip][:, [0, 3, 2, 1]]
+    normals = np.repeat(unit[axis] * sign[:, None], 4, axis=0)
+    triangles = (np.arange(n, dtype=np.uint32)[:, None] * 4 + QUAD_INDICES).ravel()
+    return {
+        'vertices': corners.astype(np.float32).ravel(),
+        'normals': normals.astype(np.float32).ravel(),
+        'colors': colors.ravel(),
+        'uvs': uvs.ravel(),
+        'triangles': triangles,
+    }
+
+def build_chunk_mesh(quads):
+    # Opaque quads under the usual keys, see-through ones under 'alpha_...'
+    q = np.array(quads, dtype=np.int32).reshape(-1, 8)
+    see_through = ~BLOCK_OPAQUE[q[:, 7] & 255]
+    data = build_quad_arrays(q[~see_through])
+    data.update({'alpha_' + k: v for k, v in build_quad_arrays(q[see_through]).items()})
+    return data
+
+def mesh_vertex_count(data):
+    return (len(data['vertices']) + len(data['alpha_vertices'])) // 3
+
+def shifted(a, offset):
+    # The inner cells of a padded array moved by offset (components -1..1)
+    return a[tuple(slice(1 + o, n - 1 + o) for o, n in zip(offset, a.shape))]
+
+def visible_faces(pad):
+    # (6, sx, sy, sz) block ids per face direction for the inner cells of a
+    # padded array, 0 where the face is hidden. A face shows when the cell it
+    # looks into can be seen through and isn't the same block (so panes of
+    # glass merge). Each direction compares the arrays shifted one cell.
+    opaque = BLOCK_OPAQUE[pad]
+    inner = (slice(1, -1),) * 3
+    ids = np.where(BLOCK_SOLID[pad[inner]], pad[inner], AIR).astype(np.uint8)
+    faces = np.empty((6,) + ids.shape, dtype=np.uint8)
+    for d, offset in enumerate(neighbors):
+        faces[d] = np.where(shifted(opaque, offset) | (shifted(pad, offset) == ids), AIR, ids)
+    return faces
+
+def face_keys(pad, light):
+    # visible_faces, with each face's light (that of the cell it looks
+    # into) and per-corner ambient occlusion packed in; see FACE_AO_SHIFT.
+    # A corner's AO counts the opaque cells beside it in the layer the face
+    # looks into: its two edge neighbours and the diagonal between them.
+    # Only the visible faces are looked at.
+    faces = visible_faces(pad)
+    opaque = BLOCK_OPAQUE[pad]
+    keys = np.zeros(faces.shape, dtype=np.int32)
+    for d, (axis, sign) in enumerate(FACE_DIRS):
+        cells = np.nonzero(faces[d])
+        # Padded-array coordinates of the cells the faces look into
+        out = [c + 1 for c in cells]
+        out[axis] = out[axis] + sign
+        key = faces[d][cells].astype(np.int32) | light[tuple(out)].astype(np.int32) << FACE_LIGHT_SHIFT
+        u, v = (axis + 1) % 3, (axis + 2) % 3
+        for k, (cu, cv) in enumerate(QUAD_CORNERS):
+            side_u, side_v = list(out), list(out)
+            side_u[u] = out[u] + 2 * cu - 1
+            side_v[v] = out[v] + 2 * cv - 1
+            corner = list(side_u)
+            corner[v] = side_v[v]
+            a, b, c = (opaque[tuple(p)] for p in (side_u, side_v, corner))
+            ao = np.where(a & b, 0, 3 - (a.astype(np.int32) + b + c))
+            key |= ao << (FACE_AO_SHIFT + 2 * k)
+        keys[d][cells] = key
+    return keys
+
+def exposed_mask(pad):
+    # Inner cells that are solid and have at least one face open to air
+    return visible_faces(pad).any(axis=0)
+
+def visible_faces_loop(pad):
+    # Cell-by-cell version of visible_faces, kept for benchmarking
+    sx, sy, sz = (s - 2 for s in pad.shape)
+    faces = np.zeros((6, sx, sy, sz), dtype=np.uint8)
+    cells = pad.tolist()
+    solid = BLOCK_SOLID.tolist()
+    opaque = BLOCK_OPAQUE.tolist()
+    for x in range(1, sx + 1):
+        for y in range(1, sy + 1):
+            for z in range(1, sz + 1):
+                b = cells[x][y][z]
+                if not solid[b]:
                     continue
-                solid[ix][iy][iz] = True
-                block_type[ix][iy][iz] = t
-
-    # Sprinkle trees on grass
-    tree_count = 0
-    rng = random.Random(1337)
-    for ix in range(2, WORLD_X - 2):
-        for iz in range(2, WORLD_Z - 2):
-            # find surface
-            top_y = -1
-            for iy in reversed(range(WORLD_Y)):
-                if solid[ix][iy][iz]:
-                    top_y = iy
-                    break
-            if top_y < 0:
+                for d, (dx,dy,dz) in enumerate(neighbors):
+                    n = cells[x+dx][y+dy][z+dz]
+                    if not opaque[n] and n != b:
+                        faces[d, x - 1, y - 1, z - 1] = b
+    return faces
+
+def mesh_chunk_naive(pad, light):
+    # One quad per visible block face
+    faces = face_keys(pad, light)
+    quads = []
+    for d, (axis, sign) in enumerate(FACE_DIRS):
+        cells = np.argwhere(faces[d])
+        ids = faces[d][tuple(cells.T)]
+        for (x, y, z), b in zip(cells.tolist(), ids.tolist()):
+            quads.append((axis, sign, x, y, z, 1, 1, b))
+    return build_chunk_mesh(quads)
+
+def greedy_rects(mask):
+    # Cover the nonzero cells of a 2D list-of-lists with maximal same-id
+    # rectangles, row-major. Yields (u, v, w, h, id); clears `mask`.
+    size_u, size_v = len(mask), len(mask[0])
+    for u in range(size_u):
+        row = mask[u]
+        v = 0
+        while v < size_v:
+            b = row[v]
+            if not b:
+                v += 1
                 continue
-            if block_type[ix][top_y][iz] != 'grass':
+            h = 1
+            while v + h < size_v and row[v + h] == b:
+                h += 1
+            run = [b] * h
+            w = 1
+            while u + w < size_u and mask[u + w][v:v + h] == run:
+                w += 1
+            for k in range(w):
+                mask[u + k][v:v + h] = [0] * h
+            yield u, v, w, h, b
+            v += h
+
+def mesh_chunk_greedy(pad, light):
+    # Merge coplanar faces of the same block type and shading into larger quads
+    faces = face_keys(pad, light)
+    quads = []
+    for d, (axis, sign) in enumerate(FACE_DIRS):
+        # Reorder to (axis, u, v) so each slice is one plane of faces
+        planes = faces[d].transpose(axis, (axis + 1) % 3, (axis + 2) % 3)
+        for layer, plane in enumerate(planes):
+            if not plane.any():
                 continue
-            if rng.random() < 0.02:  # ~2% chance
-                make_tree(ix, top_y + 1, iz, rng)
-                tree_count += 1
-
-def make_tree(ix, iy, iz, rng):
-    height = rng.randint(3, 5)
-    # Trunk
-    for dy in range(height):
-        place_array(ix, iy + dy, iz, 'wood', overwrite_air_only=True)
-    # Leaves blob
-    top = iy + height - 1
-    for dx in range(-2, 3):
-        for dz in range(-2, 3):
-            for dy in range(-2, 3):
-                if abs(dx) + abs(dy) + abs(dz) <= 4:
-                    if rng.random() < 0.92:
-                        place_array(ix + dx, top + dy, iz + dz, 'leaves', overwrite_air_only=True)
+            for u, v, w, h, b in greedy_rects(plane.tolist()):
+                pos = [0, 0, 0]
+                pos[axis], pos[(axis + 1) % 3], pos[(axis + 2) % 3] = layer, u, v
+                quads.append((axis, sign, *pos, w, h, b))
+    return build_chunk_mesh(quads)
 
-def place_array(ix, iy, iz, t, overwrite_air_only=True):
-    if not in_bounds(ix, iy, iz):
+MESHERS = {'naive': mesh_chunk_naive, 'greedy': mesh_chunk_greedy}
+mesher = 'greedy'
+
+def benchmark_surface_extraction(size=(64, WORLD_Y, 64), repeats=20):
+    # Loop vs. vectorised face visibility on the same seed-2009 terrain
+    # around spawn, padded by one cell like a chunk
+    sx, _, sz = to_index(0, 0, 0)
+    lo = (sx - size[0] // 2 - 1, -1, sz - size[2] // 2 - 1)
+    pad = generate_region(lo, tuple(l + n + 2 for l, n in zip(lo, size)))
+    t0 = time.perf_counter()
+    slow = visible_faces_loop(pad)
+    loop_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        fast = visible_faces(pad)
+    fast_ms = (time.perf_counter() - t0) * 1000 / repeats
+    assert np.array_equal(slow, fast)
+    print(f'surface extraction {size[0]}x{size[1]}x{size[2]}: '
+          f'{int(exposed_mask(pad).sum())} exposed blocks, {int(np.count_nonzero(fast))} faces')
+    print(f'  loop:       {loop_ms:8.2f} ms')
+    print(f'  vectorised: {fast_ms:8.2f} ms  ({loop_ms / fast_ms:.0f}x)')
+    return loop_ms, fast_ms
+
+def alpha_order(centres, eye):
+    # Triangle list that draws quads farthest first as seen from eye
+    order = np.argsort(-((centres - eye) ** 2).sum(axis=1), kind='stable').astype(np.uint32)
+    return (order[:, None] * 4 + QUAD_INDICES).ravel()
+
+def chunk_pass(ent, data, prefix, transparency, collide=True):
+    # Give `ent` the mesh stored under `prefix` in data, on the shared texture
+    ent.model = Mesh(vertices=data[prefix + 'vertices'], triangles=data[prefix + 'triangles'],
+                     colors=data[prefix + 'colors'], uvs=data[prefix + 'uvs'], normals=data[prefix + 'normals'])
+    ent.texture = CHUNK_TEXTURE
+    ent.model.setTransparency(transparency)
+    if collide and PLAYER_PHYSICS == 'collider':
+        # MeshCollider reads per-triangle corners; the arrays above are flat
+        ent.model.generated_vertices = data[prefix + 'vertices'].reshape(-1, 3)[data[prefix + 'triangles']]
+        ent.collider = MeshCollider(ent, mesh=ent.model)
+
+def upload_chunk_mesh(key, data):
+    # Main-thread only: hand packed arrays to Ursina
+    ent = chunk_entities.pop(key, None)
+    if ent:
+        destroy(ent)
+    chunk_alpha.pop(key, None)
+    chunk_vertex_counts.pop(key, None)
+    if len(data['triangles']) == 0 and len(data['alpha_triangles']) == 0:
         return
-    if overwrite_air_only and solid[ix][iy][iz]:
+    chunk_vertex_counts[key] = mesh_vertex_count(data)
+    lo, _ = chunk_bounds(key)
+    ent = Entity(position=Vec3(*to_world(*lo)) + VOXEL_MIN_CORNER)
+    if len(data['triangles']):
+        chunk_pass(ent, data, '', TransparencyAttrib.M_none)
+    if len(data['alpha_triangles']):
+        centres = data['alpha_vertices'].reshape(-1, 4, 3).mean(axis=1) + np.array(ent.position, dtype=np.float32)
+        cell = camera_cell()
+        data['alpha_triangles'] = alpha_order(centres, np.array(camera.world_position, dtype=np.float32))
+        alpha = Entity(parent=ent)
+        chunk_pass(alpha, data, 'alpha_', TransparencyAttrib.M_alpha)
+        alpha.model.setBin('transparent', 0)
+        alpha.model.setDepthWrite(False)
+        chunk_alpha[key] = (alpha, centres, cell)
+    chunk_entities[key] = ent
+
+def sort_alpha_chunks():
+    # Re-order the see-through quads of chunks near the camera once it has
+    # moved to another cell
+    cell = camera_cell()
+    near = chunk_of(*cell)
+    eye = np.array(camera.world_position, dtype=np.float32)
+    for key, (alpha, centres, sorted_for) in chunk_alpha.items():
+        if sorted_for == cell or max(abs(a - b) for a, b in zip(key, near)) > ALPHA_SORT_RADIUS:
+            continue
+        alpha.model.triangles = alpha_order(centres, eye)
+        alpha.model.generate()
+        chunk_alpha[key] = (alpha, centres, cell)
+
+def compare_meshers():
+    # Mesh the whole current world with every mesher; vertex count and build time
+    pads = [(padded_chunk(key), padded_light(key)) for key in chunks]
+    results = {}
+    for name, fn in MESHERS.items():
+        t0 = time.perf_counter()
+        verts = sum(mesh_vertex_count(fn(pad, light)) for pad, light in pads)
+        results[name] = (verts, (time.perf_counter() - t0) * 1000)
+    for name, (verts, ms) in results.items():
+        print(f'{name:>6} mesher: {verts:7d} vertices  {ms:7.1f} ms')
+    return results
+
+def cycle_mesher():
+    global mesher
+    names = list(MESHERS)
+    mesher = names[(names.index(mesher) + 1) % len(names)]
+    dirty_chunks.update(chunks)
+
+# ---------- Chunk culling ----------
+# Chunk meshes outside the camera frustum or farther than VIEW_DISTANCE are
+# disabled before the frame renders, so draw cost follows what is on screen
+# rather than how much world is loaded. Columns out to LOD_RADIUS are drawn,
+# as blocks or LOD meshes, so nothing within it is cut by distance.
+VIEW_DISTANCE = 11 * CHUNK_SIZE
+culled_chunks = 0
+occluded_chunks = 0
+drawn_chunks = set()
+drawn_lods = set()
+
+def frustum_visible(keys, size=(CHUNK_SIZE,) * 3, max_dist=VIEW_DISTANCE):
+    # Per chunk: does its bounding box (`size` blocks from the chunk's
+    # corner) touch the view frustum within max_dist
+    lo = (np.array(keys, dtype=np.float32) * CHUNK_SIZE
+          + np.array(WORLD_ORIGIN, dtype=np.float32) + np.array(VOXEL_MIN_CORNER, dtype=np.float32))
+    hi = lo + np.array(size, dtype=np.float32)
+    p = np.array(camera.world_position, dtype=np.float32)
+    f, r, u = (np.array(v, dtype=np.float32) for v in (camera.forward, camera.right, camera.up))
+    # Inward normals of the four side planes, which all pass through the camera
+    h, v = (math.radians(a) / 2 for a in camera.lens.getFov())
+    planes = np.array([r * math.cos(h) + f * math.sin(h), -r * math.cos(h) + f * math.sin(h),
+                       u * math.cos(v) + f * math.sin(v), -u * math.cos(v) + f * math.sin(v)])
+    # A box is outside a plane when even its corner furthest along the normal is
+    corner = np.where(planes[None] >= 0, hi[:, None], lo[:, None])
+    in_frustum = (((corner - p) * planes).sum(axis=2) >= 0).all(axis=1)
+    in_range = np.linalg.norm(np.clip(p, lo, hi) - p, axis=1) <= max_dist
+    return (in_frustum & in_range).tolist()
+
+def cull_chunks():
+    global culled_chunks, occluded_chunks, drawn_chunks, drawn_lods
+    # Columns drawn from their LOD mesh don't draw their chunks
+    pc = player_chunk()
+    lod_shown = [c for c in lod_entities if lod_shown_for(c, pc)]
+    lod_in_view = [vis for vis in frustum_visible([(cx, 0, cz) for cx, cz in lod_shown],
+                                                  (CHUNK_SIZE, WORLD_Y, CHUNK_SIZE))] if lod_shown else []
+    drawn_lods = {c for c, vis in zip(lod_shown, lod_in_view) if vis}
+    for column, (_, ent) in lod_entities.items():
+        if ent and ent.enabled != (column in drawn_lods):
+            ent.enabled = column in drawn_lods
+    lod_shown = set(lod_shown)
+    keys = [key for key in chunks if (key[0], key[2]) not in lod_shown]
+    in_view = {key for key, vis in zip(keys, frustum_visible(keys)) if vis} if keys else set()
+    reachable = occlusion_reachable(in_view)
+    drawn_chunks = in_view & reachable
+    # With mesh colliders the player still needs the chunks it can't see
+    attr = 'enabled' if PLAYER_PHYSICS == 'grid' else 'visible'
+    for key, ent in chunk_entities.items():
+        vis = key in drawn_chunks
+        if getattr(ent, attr) != vis:
+            setattr(ent, attr, vis)
+    culled_chunks = len(chunk_entities) - len(drawn_chunks & chunk_entities.keys())
+    occluded_chunks = len((in_view - reachable) & chunk_entities.keys())
+
+def lod_shown_for(column, pc=None):
+    # Past LOAD_RADIUS a column is always drawn from its LOD mesh; nearer,
+    # only until all its chunks are in and meshed
+    return (column_distance(column, pc) > LOAD_RADIUS
+            or any(key not in chunks or key in dirty_chunks or key in remeshing for key in column_keys(*column)))
+
+# ---------- Cave occlusion ----------
+# Each chunk records which pairs of its six faces are joined by see-through
+# cells (a flood fill of air, leaves and glass). Starting from the camera's
+# chunk, a breadth-first walk only crosses from one chunk into the next
+# through faces that connect, and never doubles back along an axis; chunks
+# it can't reach are sealed off from the camera, like most of the caves.
+ALL_CONNECTED = (1 << 36) - 1
+chunk_connectivity = {}     # (cx,cy,cz) -> bit a*6+b set when faces a and b connect
+stale_connectivity = set()  # chunks to flood-fill again after loads and edits
+camera_regions = {}         # camera's chunk -> face_regions() of it
+
+def face_regions(blocks):
+    """Flood-fill the see-through cells of a chunk.
+
+    Returns (labels, regions): a region label per cell (-1 for opaque ones)
+    and, per face in `neighbors` order, the set of labels touching it.
+    """
+    see_through = ~BLOCK_OPAQUE[blocks]
+    # Label connected regions by spreading the smallest cell index through
+    # see-through neighbours until nothing changes
+    sealed = see_through.size
+    labels = np.where(see_through, np.arange(sealed).reshape(see_through.shape), sealed)
+    while True:
+        spread = labels.copy()
+        for axis in range(3):
+            lower = [slice(None)] * 3
+            upper = [slice(None)] * 3
+            lower[axis], upper[axis] = slice(None, -1), slice(1, None)
+            lower, upper = tuple(lower), tuple(upper)
+            np.minimum(spread[lower], labels[upper], out=spread[lower])
+            np.minimum(spread[upper], labels[lower], out=spread[upper])
+        spread[~see_through] = sealed
+        if np.array_equal(spread, labels):
+            break
+        labels = spread
+    regions = []
+    for axis, sign in FACE_DIRS:
+        face = labels.take(-1 if sign > 0 else 0, axis=axis)
+        regions.append(set(np.unique(face).tolist()) - {sealed})
+    labels[labels == sealed] = -1
+    return labels, regions
+
+def face_connectivity(blocks):
+    see_through = ~BLOCK_OPAQUE[blocks]
+    if see_through.all():
+        return ALL_CONNECTED
+    if not see_through.any():
+        return 0
+    _, regions = face_regions(blocks)
+    bits = 0
+    for a in range(6):
+        for b in range(6):
+            if regions[a] & regions[b]:
+                bits |= 1 << (a * 6 + b)
+    return bits
+
+def occlusion_reachable(in_view):
+    # Chunks the camera may see into, or all of in_view when the camera
+    # isn't inside the loaded world
+    for key in stale_connectivity:
+        chunk_connectivity[key] = face_connectivity(chunks[key].to_array())
+        camera_regions.pop(key, None)
+    stale_connectivity.clear()
+    cell = camera_cell()
+    start = chunk_of(*cell)
+    start_exits = ALL_CONNECTED
+    if start in chunks:
+        # Leave the camera's chunk only through faces its own cell can reach
+        if start not in camera_regions:
+            camera_regions.clear()
+            camera_regions[start] = face_regions(chunks[start].to_array())
+        labels, regions = camera_regions[start]
+        label = labels[cell[0] % CHUNK_SIZE, cell[1] % CHUNK_SIZE, cell[2] % CHUNK_SIZE]
+        if label >= 0:
+            start_exits = sum(1 << d for d in range(6) if label in regions[d])
+        queue = deque([(start, -1, 0)])
+    elif start[1] * CHUNK_SIZE >= WORLD_Y:
+        # Above the world: every top chunk is open to the sky
+        top = WORLD_Y // CHUNK_SIZE - 1
+        queue = deque([(key, 2, 1 << 3) for key in in_view if key[1] == top])
+    else:
+        return in_view
+    seen = {key for key, _, _ in queue}
+    while queue:
+        key, entry, travelled = queue.popleft()
+        conn = chunk_connectivity[key]
+        for d, (dx, dy, dz) in enumerate(neighbors):
+            # d ^ 1 is the opposite direction
+            if travelled >> (d ^ 1) & 1:
+                continue
+            if entry < 0 and not start_exits >> d & 1:
+                continue
+            if entry >= 0 and not conn >> (entry * 6 + d) & 1:
+                continue
+            n = (key[0] + dx, key[1] + dy, key[2] + dz)
+            if n in seen or n not in in_view:
+                continue
+            seen.add(n)
+            queue.append((n, d ^ 1, travelled | 1 << d))
+    return seen
+
+# ---------- Block picking ----------
+PICK_DISTANCE = 8
+
+def world_to_grid(x, y, z):
+    # Continuous index-space coordinates of a world point; floor() gives the cell
+    ox, oy, oz = WORLD_ORIGIN
+    return (x - VOXEL_MIN_CORNER.x - ox, y - VOXEL_MIN_CORNER.y - oy, z - VOXEL_MIN_CORNER.z - oz)
+
+def camera_cell():
+    # Index of the cell the camera is in
+    return tuple(math.floor(c) for c in world_to_grid(*camera.world_position))
+
+def raycast_voxel(origin, direction, max_dist=PICK_DISTANCE):
+    """Step through grid cells along a ray (Amanatides & Woo).
+
+    Returns (world block position, face normal) of the first solid block,
+    or None. Cost depends on ray length only, not on the world contents.
+    """
+    length = math.sqrt(sum(c * c for c in direction))
+    if length == 0:
+        return None
+    d = [c / length for c in direction]
+    p = world_to_grid(*origin)
+    cell = [math.floor(c) for c in p]
+    step = [1 if c > 0 else -1 if c < 0 else 0 for c in d]
+    t_delta = [abs(1 / c) if c else math.inf for c in d]
+    t_max = [((cell[a] + (step[a] > 0)) - p[a]) / d[a] if d[a] else math.inf for a in range(3)]
+    normal = (0, 0, 0)
+    t = 0.0
+    while t <= max_dist:
+        if in_bounds(*cell) and is_solid(*cell):
+            return to_world(*cell), normal
+        axis = t_max.index(min(t_max))
+        t = t_max[axis]
+        cell[axis] += step[axis]
+        t_max[axis] += t_delta[axis]
+        normal = tuple(-step[axis] if a == axis else 0 for a in range(3))
+    return None
+
+def hovered_block():
+    # (world block position, face normal) under the reticle, or None
+    return raycast_voxel(camera.world_position, camera.forward)
+
+# ---------- Frame scheduler ----------
+# Heavy main-thread work (adding streamed chunks, remeshing) runs as jobs:
+# generators that do a bounded slice of work per step. run_jobs() steps them
+# every frame until FRAME_BUDGET_MS is spent, the job for the chunk nearest
+# the player first, each job to its end before the next starts. At least
+# one step runs per frame, so nothing starves. Jobs without a chunk key
+# (remeshes after an edit) go before all others and run to the end in the
+# frame they were queued, budget or not.
+FRAME_BUDGET_MS = 8.0
+scheduled_jobs = []     # (chunk key, or None to go first; generator)
+
+def add_job(job, key=None):
+    scheduled_jobs.append((key, job))
+
+def run_jobs(budget_ms=FRAME_BUDGET_MS):
+    # Returns the number of steps taken
+    pc = player_chunk()
+    queue_remeshes()
+    scheduled_jobs.sort(key=lambda job: -1 if job[0] is None else sum((a - b) ** 2 for a, b in zip(job[0], pc)))
+    deadline = time.perf_counter() + budget_ms / 1000
+    steps = 0
+    while not steps or time.perf_counter() < deadline or (scheduled_jobs and scheduled_jobs[0][0] is None):
+        # Finished jobs may have left chunks dirty
+        if not scheduled_jobs and not queue_remeshes():
+            break
+        try:
+            next(scheduled_jobs[0][1])
+        except StopIteration:
+            scheduled_jobs.pop(0)
+        steps += 1
+    return steps
+
+# ---------- Dirty chunks ----------
+# Edits only mark chunks dirty; each dirty chunk gets one remesh job, so many
+# edits in one frame cost one rebuild. Chunks holding an edited block are
+# remeshed ahead of everything else, in one step, so the edit shows the
+# frame it's made; chunks dirty for other reasons (light, streaming) wait
+# their turn.
+dirty_chunks = set()
+edit_dirty = set()      # dirty chunks holding an edited block
+remeshing = {}          # chunk -> its queued or running remesh job
+
+def mark_block_dirty(ix, iy, iz):
+    # Every chunk whose padded array holds the block: the owner, plus those
+    # across any border or edge it touches (corner AO looks diagonally)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            for dz in (-1, 0, 1):
+                n = chunk_of(ix + dx, iy + dy, iz + dz)
+                if n in chunks:
+                    dirty_chunks.add(n)
+                    edit_dirty.add(n)
+
+def mark_light_dirty(cells):
+    # Chunks with faces looking into any of `cells`: their owners, and the
+    # chunk across a border for cells on one
+    cells = np.asarray(cells).reshape(-1, 3)
+    if not len(cells):
         return
-    solid[ix][iy][iz] = True
-    block_type[ix][iy][iz] = t
+    offsets = np.array([(0, 0, 0)] + neighbors)
+    keys = (cells[:, None] + offsets).reshape(-1, 3) // CHUNK_SIZE
+    for n in set(map(tuple, np.unique(keys, axis=0).tolist())):
+        if n in chunks:
+            dirty_chunks.add(n)
 
-# ---------- Surface extraction ----------
-neighbors = [(1,0,0),(-1,0,0),(0,1,0),(0,-1,0),(0,0,1),(0,0,-1)]
+def player_chunk():
+    if not player:
+        return chunk_of(*to_index(0, 0, 0))     # spawn
+    return chunk_of(*(math.floor(c) for c in world_to_grid(player.x, player.y, player.z)))
+
+def queue_remeshes():
+    # A remesh job for every dirty chunk without one, and an edit remesh for
+    # every edited one, replacing the job it had; returns how many
+    edited = edit_dirty & dirty_chunks
+    edit_dirty.clear()
+    for key in edited & remeshing.keys():
+        remeshing.pop(key).close()
+    new = dirty_chunks - remeshing.keys()
+    for key in new:
+        remeshing[key] = remesh_job(key, key in edited)
+        add_job(remeshing[key], None if key in edited else key)
+    return len(new)
+
+def remesh_job(key, edit=False):
+    # Gather, mesh and upload as separate steps, or as one after an edit.
+    # An edit landing meanwhile leaves the chunk dirty, and a new job
+    # remeshes it after this one.
+    try:
+        dirty_chunks.discard(key)
+        if key not in chunks:
+            return
+        pad, light = padded_chunk(key), padded_light(key)
+        if not edit:
+            yield
+        data = MESHERS[mesher](pad, light)
+        if not edit:
+            yield
+        if key in chunks and key not in dirty_chunks:
+            upload_chunk_mesh(key, data)
+    finally:
+        remeshing.pop(key, None)
+
+# ---------- Chunk streaming ----------
+def column_keys(cx, cz):
+    return [(cx, cy, cz) for cy in range(WORLD_Y // CHUNK_SIZE)]
 
-def is_exposed(ix, iy, iz):
-    if not solid[ix][iy][iz]:
+def load_chunk(key):
+    # Bring back a chunk we hold; returns False if it has to be generated
+    chunk = chunk_cache.pop(key, None)
+    if chunk is None and key in saved_chunks:
+        arr = np.frombuffer(zlib.decompress(saved_chunks.pop(key)), dtype=np.uint8)
+        chunk = PaletteChunk.from_array(arr.reshape((CHUNK_SIZE,) * 3))
+    if chunk is None:
         return False
-    for dx,dy,dz in neighbors:
-        nx, ny, nz = ix+dx, iy+dy, iz+dz
-        if not in_bounds(nx, ny, nz) or not solid[nx][ny][nz]:
-            return True
-    return False
+    chunks[key] = chunk
+    chunk_tops[key] = solid_tops(chunk.to_array())
+    chunk_light[key] = world_light(key)
+    dirty_chunks.add(key)
+    stale_connectivity.add(key)
+    # Neighbours meshed their borders against generated terrain
+    if key in edited_chunks:
+        for dx, dy, dz in neighbors:
+            n = (key[0] + dx, key[1] + dy, key[2] + dz)
+            if n in chunks:
+                dirty_chunks.add(n)
+    return True
 
-# ---------- Voxel entity ----------
-class Voxel(Button):
-    def __init__(self, wpos=(0,0,0), btype='stone'):
-        super().__init__(
-            parent=scene,
-            position=wpos,
-            model='cube',
-            origin_y=0.5,
-            texture='white_cube',
-            color=BLOCKS.get(btype, color.white),
-            highlight_color=color.azure,
-            scale=1,
-        )
-        self.btype = btype
-        self.world_pos = tuple(int(v) for v in wpos)
+def unload_chunk(key):
+    ent = chunk_entities.pop(key, None)
+    if ent:
+        destroy(ent)
+    chunk_alpha.pop(key, None)
+    chunk_vertex_counts.pop(key, None)
+    dirty_chunks.discard(key)
+    chunk_connectivity.pop(key, None)
+    stale_connectivity.discard(key)
+    chunk_tops.pop(key, None)
+    chunk_light.pop(key, None)
+    chunk_cache[key] = chunks.pop(key)
+    # Memory cap: unedited chunks are dropped (regenerated on demand),
+    # edited ones are compressed
+    cached = sum(c.nbytes for c in chunk_cache.values())
+    while cached > CHUNK_CACHE_BYTES:
+        old_key, old = chunk_cache.popitem(last=False)
+        cached -= old.nbytes
+        if old_key in edited_chunks:
+            saved_chunks[old_key] = zlib.compress(old.to_array().tobytes())
 
-    def input(self, key):
-        if paused:
+def in_load_range(key, radius):
+    return column_distance((key[0], key[2])) <= radius
+
+def column_distance(column, pc=None):
+    # In columns from the player's (or pc's), along the farther axis
+    pcx, _, pcz = pc or player_chunk()
+    return max(abs(column[0] - pcx), abs(column[1] - pcz))
+
+def update_streaming():
+    for key in [k for k in chunks if not in_load_range(k, UNLOAD_RADIUS)]:
+        unload_chunk(key)
+    collect_built_chunks()
+    # Missing chunks nearest first: ones held in memory or on disk are
+    # added by a job, new ones go to the workers (or are built by a job
+    # without them)
+    pcx, _, pcz = player_chunk()
+    r = LOAD_RADIUS
+    missing = [key
+               for cx in range(pcx - r, pcx + r + 1)
+               for cz in range(pcz - r, pcz + r + 1)
+               for key in column_keys(cx, cz)
+               if key not in chunks and key not in pending_chunks and key not in queued_chunks]
+    missing.sort(key=lambda k: (k[0] - pcx) ** 2 + (k[2] - pcz) ** 2)
+    pool = worker_pool()
+    for key in missing:
+        held = key in chunk_cache or key in saved_chunks
+        if pool and not held and not cache_has(chunk_entry(key, mesher)):
+            if len(pending_chunks) >= MAX_PENDING_JOBS:
+                break
+            pending_chunks[key] = pool.submit(build_chunk_job, key, mesher)
+        else:
+            queue_chunk(key)
+    update_lods()
+
+queued_chunks = set()   # chunks with a stream_job queued
+
+def queue_chunk(key, arrays=None, mesher_name=None):
+    queued_chunks.add(key)
+    add_job(stream_job(key, arrays, mesher_name), key)
+
+def stream_job(key, arrays, mesher_name):
+    # Add one chunk to the world, unless it left the load range meanwhile:
+    # from a worker's arrays, else restored from memory, else read from the
+    # disk cache, else built here
+    try:
+        if key in chunks or not in_load_range(key, UNLOAD_RADIUS):
             return
-        if not self.hovered:
+        if arrays is None and load_chunk(key):
             return
-        if key == 'left mouse down':
-            break_block(self.world_pos)
-        elif key == 'right mouse down':
-            place_adjacent(self.world_pos)
+        if arrays is None:
+            arrays, mesher_name = cache_get(chunk_entry(key, mesher)), mesher
+        if arrays is None:
+            # Generate, light and mesh in steps the scheduler can spread over
+            # frames, then upload
+            arrays = yield from chunk_build_steps(key, mesher)
+            cache_put(chunk_entry(key, mesher_name), arrays)
+            yield
+            if key in chunks or not in_load_range(key, UNLOAD_RADIUS):
+                return
+        add_built_chunk(key, arrays, mesher_name)
+    finally:
+        queued_chunks.discard(key)
 
-# ---------- World entity management ----------
-def spawn_surface_block(ix, iy, iz):
-    if not in_bounds(ix, iy, iz):
+# ---------- Background chunk builds ----------
+# Generation and mesh-array building for new chunks run in worker processes.
+# A worker generates the chunk with a one-cell border (the generator is a pure
+# function of coordinates, so it needs no world state), meshes it and hands
+# the packed arrays back through one shared-memory block. The main thread
+# only copies them out and uploads the Mesh.
+pending_chunks = {}     # (cx,cy,cz) -> Future of build_chunk_job
+_pool = None
+
+def worker_pool():
+    # Forked on Linux, where that's safe and starts fastest; spawned
+    # elsewhere, where each worker imports this file (see MAIN_PROCESS)
+    global _pool
+    if _pool is None:
+        # One tracker for every process, so the main thread's unlink()
+        # balances the register() done by the worker that created the block
+        if SHARED_RESULTS:
+            resource_tracker.ensure_running()
+        method = 'fork' if sys.platform.startswith('linux') else 'spawn'
+        # Lower priority so the workers never take CPU from the frame itself
+        nice = (os.nice, (10,)) if hasattr(os, 'nice') else (None, ())
+        _pool = ProcessPoolExecutor(WORKERS, mp_context=multiprocessing.get_context(method),
+                                    initializer=nice[0], initargs=nice[1])
+    return _pool
+
+@atexit.register
+def shutdown_workers():
+    # Free the shared memory of jobs that finished after the last frame
+    for fut in [*pending_chunks.values(), *pending_lods.values()]:
+        if not fut.cancel() and fut.exception() is None:
+            unpack_shared(*fut.result()[0])
+    pending_chunks.clear()
+    pending_lods.clear()
+    if _pool:
+        _pool.shutdown()
+
+def build_chunk_arrays(key, mesher_name):
+    # Block data, light and mesh arrays for a freshly generated chunk
+    steps = chunk_build_steps(key, mesher_name)
+    try:
+        while True:
+            next(steps)
+    except StopIteration as done:
+        return done.value
+
+def chunk_build_steps(key, mesher_name):
+    # build_chunk_arrays as a job: yields after generating each column of the
+    # light box, after lighting and after meshing, and returns the arrays
+    for dx in (-1, 0, 1):
+        for dz in (-1, 0, 1):
+            generated_column(key[0] + dx, key[2] + dz)
+            yield
+    world, column_light = lit_column(key[0], key[2])
+    yield
+    pad = chunk_in_box(world, key)
+    light = chunk_in_box(column_light, key)
+    blocks = pad[1:-1, 1:-1, 1:-1]
+    arrays = dict(MESHERS[mesher_name](pad, light))
+    yield
+    packed = PaletteChunk.from_array(blocks)
+    arrays['palette'] = np.array(packed.palette, dtype=np.uint8)
+    arrays['packed'] = np.frombuffer(packed.data, dtype=np.uint8)
+    arrays['connectivity'] = np.array([face_connectivity(blocks)], dtype=np.uint64)
+    arrays['tops'] = solid_tops(blocks)
+    arrays['light'] = light[1:-1, 1:-1, 1:-1]
+    return arrays
+
+@functools.lru_cache(maxsize=(2 * UNLOAD_RADIUS + 3) ** 2)
+def generated_column(cx, cz):
+    # One chunk column, full height plus a row above and below; enough are
+    # kept to light everything in range
+    lo, hi = chunk_bounds((cx, 0, cz))
+    return generate_region((lo[0], -1, lo[2]), (hi[0], WORLD_Y + 1, hi[2]))
+
+@functools.lru_cache(maxsize=2)
+def lit_column(cx, cz):
+    # Generated blocks and their light over the light box of a chunk column,
+    # i.e. it and the 8 columns around it. Columns stream in nearest first,
+    # so most of those were generated for a neighbour already, and all the
+    # layers of a column share the result.
+    world = np.concatenate([np.concatenate([generated_column(cx + dx, cz + dz) for dz in (-1, 0, 1)], axis=2)
+                            for dx in (-1, 0, 1)], axis=0)
+    return world, skylight(world, -1)
+
+def build_chunk_job(key, mesher_name):
+    # Runs in a worker process
+    return pack_shared(build_chunk_arrays(key, mesher_name)), mesher_name
+
+# A Windows shared-memory block is gone once the worker that made it closes
+# it, so there results go back through the pool's pipe instead
+SHARED_RESULTS = os.name == 'posix'
+
+def pack_shared(arrays):
+    # Copy arrays into one new shared-memory block; returns (name, layout),
+    # or (None, arrays) without SHARED_RESULTS
+    if not SHARED_RESULTS:
+        return None, arrays
+    layout, size = [], 0
+    for name, a in arrays.items():
+        layout.append((name, a.dtype.str, a.shape, size))
+        size += a.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for (name, dtype, shape, offset), a in zip(layout, arrays.values()):
+        view = np.ndarray(shape, dtype, buffer=shm.buf, offset=offset)
+        view[...] = a
+        del view
+    shm.close()
+    return shm.name, layout
+
+def unpack_shared(name, layout):
+    # Copy the arrays back out and free the block
+    if name is None:
+        return layout
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return {key: np.ndarray(shape, dtype, buffer=shm.buf, offset=offset).copy()
+                for key, dtype, shape, offset in layout}
+    finally:
+        shm.close()
+        shm.unlink()
+
+def collect_built_chunks():
+    # Copy finished builds out of shared memory and queue them for upload
+    for key in [key for key, fut in pending_chunks.items() if fut.done()]:
+        packed, mesher_name = pending_chunks.pop(key).result()
+        arrays = unpack_shared(*packed)
+        cache_put(chunk_entry(key, mesher_name), arrays)
+        if in_load_range(key, UNLOAD_RADIUS):
+            queue_chunk(key, arrays, mesher_name)
+
+def add_built_chunk(key, arrays, mesher_name):
+    chunks[key] = PaletteChunk(arrays.pop('palette').tolist(), bytearray(arrays.pop('packed').tobytes()))
+    chunk_connectivity[key] = int(arrays.pop('connectivity')[0])
+    chunk_tops[key] = arrays.pop('tops').copy()
+    chunk_light[key] = arrays.pop('light').copy()
+    # The worker lit and meshed against generated neighbours; redo both on
+    # this thread if one within light range is edited, or the mesher changed
+    edited_nearby = any((key[0] + dx, cy, key[2] + dz) in edited_chunks
+                        for dx in (-1, 0, 1) for dz in (-1, 0, 1) for cy in range(WORLD_Y // CHUNK_SIZE))
+    if edited_nearby:
+        chunk_light[key] = world_light(key)
+    if edited_nearby or mesher_name != mesher:
+        dirty_chunks.add(key)
+    else:
+        upload_chunk_mesh(key, arrays)
+
+def player_cells():
+    # Cells solid blocks mustn't be put in: grid physics can't push the
+    # player out of a cell it's already inside
+    if isinstance(player, GridPlayer):
+        return set(player.box_cells(player.position))
+    return set()
+
+def place_adjacent(wpos, normal):
+    global current_block_type
+    # Place on the face you're pointing at
+    ix, iy, iz = to_index(*(c + n for c, n in zip(wpos, normal)))
+    if (ix, iy, iz) in player_cells():
         return
-    if not solid[ix][iy][iz]:
+    place_array(ix, iy, iz, current_block_type)
+
+def break_block(wpos):
+    wx, wy, wz = wpos
+    ix, iy, iz = to_index(wx, wy, wz)
+    if not is_solid(ix, iy, iz):
+        return
+    # Remove block
+    place_array(ix, iy, iz, 'air', overwrite_air_only=False)
+
+# ---------- Disk cache ----------
+# Opt-in with --cache[=dir]. Chunks built from the generator (block data,
+# light and mesh arrays, exactly as a worker returns them) and LOD meshes
+# are appended to one flat file, in a directory named after everything
+# that decides them. The index maps each entry to its arrays' (dtype,
+# shape, offset) in the file, the layout shared-memory results use, so a
+# warm start maps the file and feeds slices of it to the usual upload path
+# with no generation, lighting or meshing. Edits never go to disk.
+GENERATOR_VERSION = 1   # bump when generation, lighting or the mesh arrays change
+CACHE_DIR = BENCH_ARGS.get('cache') or ('cavegame-cache' if '--cache' in sys.argv else None)
+CACHE_INDEX_EVERY = 64  # new entries between index writes
+cache_index = None      # entry -> layout, None without --cache
+cache_file = None       # data file, open for appending
+cache_data = None       # read-only memmap of the data file
+cache_unsaved = 0
+
+def cache_path(name):
+    world = f'v{GENERATOR_VERSION}-seed{TERRAIN_SEED}-trees{TREE_SEED}-h{WORLD_Y}-c{CHUNK_SIZE}'
+    return os.path.join(CACHE_DIR, world, name)
+
+def open_cache():
+    global cache_index, cache_file
+    os.makedirs(os.path.dirname(cache_path('')), exist_ok=True)
+    cache_file = open(cache_path('chunks.bin'), 'ab')
+    cache_index = {}
+    try:
+        with open(cache_path('index.json')) as f:
+            cache_index = json.load(f)
+    except (OSError, ValueError):
+        return
+    # Entries past the end of the data file were never fully written
+    size = cache_file.tell()
+    cache_index = {entry: layout for entry, layout in cache_index.items() if layout_end(layout) <= size}
+
+def layout_end(layout):
+    return max((offset + np.dtype(dtype).itemsize * math.prod(shape) for _, dtype, shape, offset in layout), default=0)
+
+def cache_has(entry):
+    return cache_index is not None and entry in cache_index
+
+def cache_get(entry):
+    # The entry's arrays as read-only views of the mapped file, or None
+    global cache_data
+    layout = cache_index.get(entry) if cache_index is not None else None
+    if layout is None:
+        return None
+    if cache_data is None or len(cache_data) < layout_end(layout):
+        # Appended since the file was mapped
+        cache_file.flush()
+        cache_data = np.memmap(cache_path('chunks.bin'), dtype=np.uint8, mode='r')
+    return {name: np.ndarray(shape, dtype, buffer=cache_data, offset=offset)
+            for name, dtype, shape, offset in layout}
+
+def cache_put(entry, arrays):
+    global cache_unsaved
+    if cache_index is None or entry in cache_index:
         return
-    if not is_exposed(ix, iy, iz):
+    layout = []
+    for name, a in arrays.items():
+        # Keep every array aligned for its dtype
+        cache_file.write(bytes(-cache_file.tell() % 8))
+        layout.append((name, a.dtype.str, a.shape, cache_file.tell()))
+        cache_file.write(np.ascontiguousarray(a).tobytes())
+    cache_index[entry] = layout
+    cache_unsaved += 1
+    if cache_unsaved >= CACHE_INDEX_EVERY:
+        save_cache_index()
+
+@atexit.register
+def save_cache_index():
+    # Data first, then the index that points into it, replaced atomically
+    global cache_unsaved
+    if cache_index is None or not cache_unsaved:
         return
-    wpos = to_world(ix, iy, iz)
-    if wpos in entities:
+    cache_file.flush()
+    tmp = cache_path('index.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(cache_index, f)
+    os.replace(tmp, cache_path('index.json'))
+    cache_unsaved = 0
+
+def chunk_entry(key, mesher_name):
+    return f'{mesher_name} {key[0]} {key[1]} {key[2]}'
+
+def lod_entry(column, step):
+    return f'lod{step} {column[0]} {column[1]}'
+
+if CACHE_DIR and MAIN_PROCESS:
+    open_cache()
+
+# ---------- Distant terrain ----------
+# Past LOAD_RADIUS, out to LOD_RADIUS, chunk columns are drawn from one mesh
+# of their top surface instead of their blocks, downsampled to square cells
+# 2, 4 or 8 blocks wide by distance. A cell is the highest block in it, so
+# it never sinks below the terrain, drawn as a box top with walls down to
+# its lower neighbours and, along the column's border, down to the world's
+# floor. Those border walls close any gap to whatever is next door, blocks
+# or another level, so levels need no stitching. The workers build columns
+# from the generator; an edited column is built by a job from the chunks
+# we hold.
+LOD_LEVELS = ((5, 2), (7, 4), (10, 8))      # (up to column distance, cell size)
+LOD_RADIUS = LOD_LEVELS[-1][0]
+lod_entities = {}       # (cx, cz) -> (cell size, Entity or None if empty)
+lod_vertex_counts = {}
+pending_lods = {}       # (cx, cz) -> Future of build_lod_job
+queued_lods = set()     # columns with a lod_job queued
+lod_scan = None         # player chunk the last full pass of update_lods was for
+
+# Face keys: full skylight and no AO on tops, a little shading on walls
+LOD_TOP_KEY = MAX_LIGHT << FACE_LIGHT_SHIFT | 0xFF << FACE_AO_SHIFT
+LOD_WALL_KEY = MAX_LIGHT << FACE_LIGHT_SHIFT | 0xAA << FACE_AO_SHIFT
+
+def lod_step(column, pc=None):
+    # Cell size a column should be drawn at, None if it's loaded as blocks
+    d = column_distance(column, pc)
+    if d <= LOAD_RADIUS:
+        return None
+    return next((step for radius, step in LOD_LEVELS if d <= radius), None)
+
+def lod_mesh(blocks, step):
+    """Mesh arrays for a column's top surface in cells `step` blocks wide.
+
+    blocks is the column's (CHUNK_SIZE, WORLD_Y, CHUNK_SIZE) block ids. Tops
+    of equal height and block are merged; walls take the block under the
+    top, so grass hills show dirt sides.
+    """
+    n = CHUNK_SIZE // step
+    tops = solid_tops(blocks).astype(np.int32)
+    x, z = np.indices(tops.shape)
+    top_ids = blocks[x, np.maximum(tops, 0), z].astype(np.int32)
+    under = blocks[x, np.maximum(tops - 1, 0), z].astype(np.int32)
+    wall_ids = np.where(BLOCK_SOLID[under] & (tops > 0), under, top_ids)
+
+    def cells(a):
+        return a.reshape(n, step, n, step).transpose(0, 2, 1, 3).reshape(n, n, step * step)
+
+    pick = cells(tops).argmax(axis=2)[..., None]
+    height = np.take_along_axis(cells(tops), pick, axis=2)[..., 0]
+    top_ids = np.take_along_axis(cells(top_ids), pick, axis=2)[..., 0]
+    wall_ids = np.take_along_axis(cells(wall_ids), pick, axis=2)[..., 0]
+
+    quads = []
+    mask = np.where(height >= 0, (height + 1) << 8 | top_ids, 0)
+    for u, v, w, h, b in greedy_rects(mask.tolist()):
+        quads.append((1, 1, u * step, (b >> 8) - 1, v * step, h * step, w * step, b & 255 | LOD_TOP_KEY))
+    # Walls from each cell's top down to the neighbour's; off the column's
+    # edge the neighbour counts as empty
+    padded = np.pad(height, 1, constant_values=-1)
+    for axis, sign, nb in ((0, 1, padded[2:, 1:-1]), (0, -1, padded[:-2, 1:-1]),
+                           (2, 1, padded[1:-1, 2:]), (2, -1, padded[1:-1, :-2])):
+        i, j = np.nonzero(height > nb)
+        if not len(i):
+            continue
+        bottom, span = nb[i, j] + 1, height[i, j] - nb[i, j]
+        # A positive face sits on the cell's last block along the axis
+        px = i * step + (step - 1 if axis == 0 and sign > 0 else 0)
+        pz = j * step + (step - 1 if axis == 2 and sign > 0 else 0)
+        size = np.full(len(i), step)
+        # Tangents are (y, z) for x faces and (x, y) for z faces
+        w, h = (span, size) if axis == 0 else (size, span)
+        keys = wall_ids[i, j] | LOD_WALL_KEY
+        quads.extend(np.stack([np.full(len(i), axis), np.full(len(i), sign), px, bottom, pz, w, h, keys], axis=1))
+    q = np.array(quads, dtype=np.int32).reshape(-1, 8)
+    return build_quad_arrays(q)
+
+def column_blocks(column, generated=False):
+    # A column's (CHUNK_SIZE, WORLD_Y, CHUNK_SIZE) block ids, straight from
+    # the generator or as we hold it
+    lo, hi = chunk_bounds((column[0], 0, column[1]))
+    lo, hi = (lo[0], 0, lo[2]), (hi[0], WORLD_Y, hi[2])
+    return generate_region(lo, hi) if generated else read_region(lo, hi)
+
+def build_lod_job(column, step):
+    # Runs in a worker process. The column is generated without going
+    # through generated_column, whose cache holds the nearby ones.
+    return pack_shared(lod_mesh(column_blocks(column, generated=True), step)), step
+
+def column_edited(column):
+    return any(key in edited_chunks for key in column_keys(*column))
+
+def update_lods():
+    # Once per player column (or after a result was thrown away): drop
+    # columns out of range or loaded as blocks, then request the missing or
+    # wrong-level ones nearest first
+    global lod_scan
+    collect_built_lods()
+    pc = player_chunk()
+    if pc == lod_scan:
         return
-    t = block_type[ix][iy][iz]
-    e = Voxel(wpos=wpos, btype=t)
-    entities[wpos] = e
+    for column in [c for c in lod_entities
+                   if column_distance(c, pc) > LOD_RADIUS + 1 or not lod_shown_for(c, pc)]:
+        drop_lod(column)
+    pcx, _, pcz = pc
+    r = LOD_RADIUS
+    missing = [(cx, cz) for cx in range(pcx - r, pcx + r + 1) for cz in range(pcz - r, pcz + r + 1)
+               if (cx, cz) not in pending_lods and (cx, cz) not in queued_lods]
+    missing = [c for c in missing if lod_step(c, pc) and lod_entities.get(c, (None,))[0] != lod_step(c, pc)]
+    missing.sort(key=lambda c: (c[0] - pcx) ** 2 + (c[1] - pcz) ** 2)
+    pool = worker_pool()
+    for column in missing:
+        edited = column_edited(column)
+        step = lod_step(column, pc)
+        if pool and not edited and not cache_has(lod_entry(column, step)):
+            # Chunks in load range go to the workers first
+            if len(pending_chunks) + len(pending_lods) >= MAX_PENDING_JOBS:
+                return
+            pending_lods[column] = pool.submit(build_lod_job, column, step)
+        else:
+            # Read from the disk cache or built by the job, under the
+            # frame budget
+            queue_lod(column, step)
+    lod_scan = pc
+
+def collect_built_lods():
+    global lod_scan
+    for column in [c for c, fut in pending_lods.items() if fut.done()]:
+        packed, step = pending_lods.pop(column).result()
+        arrays = unpack_shared(*packed)
+        cache_put(lod_entry(column, step), arrays)
+        if lod_step(column) == step:
+            queue_lod(column, step, arrays)
+        else:
+            lod_scan = None
+
+def queue_lod(column, step, arrays=None):
+    queued_lods.add(column)
+    add_job(lod_job(column, step, arrays), (column[0], 0, column[1]))
+
+def lod_job(column, step, arrays=None):
+    # Upload a column's LOD mesh, reading it from the disk cache or building
+    # it here first if need be, unless it has changed level meanwhile
+    global lod_scan
+    try:
+        if arrays is None:
+            edited = column_edited(column)
+            arrays = None if edited else cache_get(lod_entry(column, step))
+            if arrays is None:
+                arrays = lod_mesh(column_blocks(column), step)
+                if not edited:
+                    cache_put(lod_entry(column, step), arrays)
+            yield
+        if lod_step(column) == step:
+            upload_lod_mesh(column, step, arrays)
+        else:
+            lod_scan = None
+    finally:
+        queued_lods.discard(column)
+
+def upload_lod_mesh(column, step, data):
+    drop_lod(column)
+    ent = None
+    if len(data['triangles']):
+        ent = Entity(position=Vec3(*to_world(column[0] * CHUNK_SIZE, 0, column[1] * CHUNK_SIZE)) + VOXEL_MIN_CORNER,
+                     enabled=False)
+        chunk_pass(ent, data, '', TransparencyAttrib.M_none, collide=False)
+        lod_vertex_counts[column] = len(data['vertices']) // 3
+    lod_entities[column] = (step, ent)
 
-def despawn_block_entity(wpos):
-    ent = entities.pop(wpos, None)
+def drop_lod(column):
+    _, ent = lod_entities.pop(column, (None, None))
     if ent:
         destroy(ent)
+    lod_vertex_counts.pop(column, None)
 
-def refresh_neighbors_surface(ix, iy, iz):
-    # After a change, create/destroy surface entities as needed around (ix,iy,iz)
-    for dx,dy,dz in neighbors + [(0,0,0)]:
-        nx, ny, nz = ix+dx, iy+dy, iz+dz
-        if not in_bounds(nx, ny, nz):
+# ---------- Bulk edits ----------
+# Region edits write straight into the chunk arrays through a vectorised
+# mask, relight the area in one pass and mark each touched chunk dirty once,
+# so a whole structure costs one remesh per chunk rather than per block.
+BULK_BOX_SIZE = 5
+BULK_SPHERE_RADIUS = 4
+BULK_REPLACE_RADIUS = 8
+
+def edit_region(lo, hi, fn):
+    """Rewrite the loaded blocks of index box [lo, hi) with fn.
+
+    fn(blocks, x, y, z) gets a chunk's share of the box and its index
+    coordinates as broadcastable axes, and returns the new block ids.
+    Returns the number of blocks that changed.
+    """
+    lo = (lo[0], max(lo[1], 0), lo[2])
+    hi = (hi[0], min(hi[1], WORLD_Y), hi[2])
+    if any(l >= h for l, h in zip(lo, hi)):
+        return 0
+    c0, c1 = chunk_of(*lo), chunk_of(*(h - 1 for h in hi))
+    changed = 0
+    removed_wood = False
+    touched_lo, touched_hi = list(hi), list(lo)
+    occupied = player_cells()
+    for cx in range(c0[0], c1[0] + 1):
+        for cy in range(c0[1], c1[1] + 1):
+            for cz in range(c0[2], c1[2] + 1):
+                key = (cx, cy, cz)
+                if key not in chunks:
+                    continue
+                clo, chi = chunk_bounds(key)
+                a = [max(l, c) for l, c in zip(lo, clo)]
+                b = [min(h, c) for h, c in zip(hi, chi)]
+                local = tuple(slice(p - c, q - c) for p, q, c in zip(a, b, clo))
+                blocks = chunks[key].to_array()
+                x, y, z = (np.arange(p, q).reshape(shape) for p, q, shape in
+                           zip(a, b, ((-1, 1, 1), (1, -1, 1), (1, 1, -1))))
+                new = np.asarray(fn(blocks[local], x, y, z), dtype=np.uint8)
+                # Nothing solid goes where the player stands
+                for cell in occupied:
+                    p = tuple(c - l for c, l in zip(cell, a))
+                    if all(0 <= c < n for c, n in zip(p, new.shape)) and BLOCK_SOLID[new[p]]:
+                        new[p] = blocks[local][p]
+                diff = new != blocks[local]
+                if not diff.any():
+                    continue
+                removed_wood |= bool(np.any(diff & (blocks[local] == WOOD)))
+                blocks[local] = new
+                chunks[key] = PaletteChunk.from_array(blocks)
+                chunk_tops[key] = solid_tops(blocks)
+                edited_chunks.add(key)
+                stale_connectivity.add(key)
+                changed += int(diff.sum())
+                touched_lo = [min(t, p) for t, p in zip(touched_lo, a)]
+                touched_hi = [max(t, q) for t, q in zip(touched_hi, b)]
+    if changed:
+        # Chunks whose padded arrays hold a changed block, then the light
+        mark_region_dirty([t - 1 for t in touched_lo], [t + 1 for t in touched_hi])
+        relight_region(touched_lo, touched_hi)
+        wake_blocks([t - 1 for t in touched_lo], [t + 1 for t in touched_hi])
+        if removed_wood:
+            r = LEAF_DECAY_RANGE
+            wake_blocks([t - r for t in touched_lo], [t + r for t in touched_hi], LEAVES)
+    return changed
+
+def mark_region_dirty(lo, hi):
+    c0, c1 = chunk_of(*lo), chunk_of(*(h - 1 for h in hi))
+    for cx in range(c0[0], c1[0] + 1):
+        for cy in range(c0[1], c1[1] + 1):
+            for cz in range(c0[2], c1[2] + 1):
+                if (cx, cy, cz) in chunks:
+                    dirty_chunks.add((cx, cy, cz))
+
+def relight_region(lo, hi):
+    # Light can only change within MAX_LIGHT of the changed box (and in its
+    # columns, for the sky); recompute that area with the light just outside
+    # it held fixed, and write back whatever differs
+    box_lo = (lo[0] - MAX_LIGHT - 1, -1, lo[2] - MAX_LIGHT - 1)
+    box_hi = (hi[0] + MAX_LIGHT + 1, WORLD_Y + 1, hi[2] + MAX_LIGHT + 1)
+    old = read_light(box_lo, box_hi, unknown=0)
+    new = skylight(read_region(box_lo, box_hi), box_lo[1], fixed=old)
+    cells = np.argwhere(new != old) + box_lo
+    for key in {tuple(k) for k in (cells // CHUNK_SIZE).tolist()}:
+        if key not in chunk_light:
             continue
-        wpos = to_world(nx, ny, nz)
-        if solid[nx][ny][nz]:
-            if is_exposed(nx, ny, nz):
-                spawn_surface_block(nx, ny, nz)
-            else:
-                despawn_block_entity(wpos)
-        else:
-            despawn_block_entity(wpos)
+        clo, chi = chunk_bounds(key)
+        a = [max(l, c) for l, c in zip(box_lo, clo)]
+        b = [min(h, c) for h, c in zip(box_hi, chi)]
+        chunk_light[key][tuple(slice(p - c, q - c) for p, q, c in zip(a, b, clo))] = \
+            new[tuple(slice(p - l, q - l) for p, q, l in zip(a, b, box_lo))]
+    mark_light_dirty(cells)
 
-def place_adjacent(wpos):
-    global current_block_type
-    # Place on the face you're pointing at
-    target_pos = Vec3(wpos) + mouse.normal
-    wx, wy, wz = int(round(target_pos.x)), int(round(target_pos.y)), int(round(target_pos.z))
-    ix, iy, iz = to_index(wx, wy, wz)
-    if not in_bounds(ix, iy, iz):
-        return
-    if solid[ix][iy][iz]:
-        return
-    # Place block
-    solid[ix][iy][iz] = True
-    block_type[ix][iy][iz] = current_block_type
-    spawn_surface_block(ix, iy, iz)
-    # Hide neighbors that became interior; show neighbors that became exposed
-    refresh_neighbors_surface(ix, iy, iz)
+def fill_box(lo, hi, block_type):
+    block_id = BLOCK_IDS[block_type]
+    return edit_region(lo, hi, lambda blocks, x, y, z: np.full_like(blocks, block_id))
 
-def break_block(wpos):
-    wx, wy, wz = wpos
-    ix, iy, iz = to_index(wx, wy, wz)
-    if not in_bounds(ix, iy, iz):
+def carve_sphere(center, radius, block_type='air'):
+    # Every cell whose centre lies within `radius` of `center` (index space)
+    block_id = BLOCK_IDS[block_type]
+    lo = tuple(math.floor(c - radius) for c in center)
+    hi = tuple(math.floor(c + radius) + 1 for c in center)
+    cx, cy, cz = center
+    return edit_region(lo, hi, lambda blocks, x, y, z: np.where(
+        (x - cx) ** 2 + (y - cy) ** 2 + (z - cz) ** 2 <= radius * radius, block_id, blocks))
+
+def replace_blocks(lo, hi, old_type, new_type):
+    old_id, new_id = BLOCK_IDS[old_type], BLOCK_IDS[new_type]
+    return edit_region(lo, hi, lambda blocks, x, y, z: np.where(blocks == old_id, new_id, blocks))
+
+def bulk_edit(key, hit):
+    # B: a box of the current block against the hovered face; X: carve a
+    # sphere around the hovered block; R: swap the hovered block's type for
+    # the current one nearby
+    wpos, normal = hit
+    ix, iy, iz = to_index(*wpos)
+    if key == 'b':
+        n = BULK_BOX_SIZE
+        # Grow away from the face, centred on it across
+        lo = [c - n // 2 if d == 0 else (c + d if d > 0 else c - n) for c, d in zip((ix, iy, iz), normal)]
+        fill_box(lo, [l + n for l in lo], current_block_type)
+    elif key == 'x':
+        carve_sphere((ix, iy, iz), BULK_SPHERE_RADIUS)
+    elif key == 'r':
+        r = BULK_REPLACE_RADIUS
+        replace_blocks((ix - r, iy - r, iz - r), (ix + r + 1, iy + r + 1, iz + r + 1),
+                       BLOCK_NAMES[get_block(ix, iy, iz)], current_block_type)
+
+# ---------- Block ticks ----------
+# Blocks that change over time (falling sand, leaves decaying away from wood,
+# glass shattering) only update when an edit next to them wakes them. A
+# woken block goes into a heap keyed by the game tick it's due, so nothing
+# scans the world: each tick pops what's due, at most MAX_BLOCK_UPDATES of
+# it, and the rest runs on the following ticks.
+TICKS_PER_SECOND = 20
+MAX_BLOCK_UPDATES = 32      # per tick
+MAX_CATCHUP_TICKS = 4       # ticks run after a long frame, at most
+LEAF_DECAY_RANGE = 4        # leaves with no wood this close decay
+
+# Delay in ticks from waking to update, as a (min, max) range
+TICK_DELAYS = {'sand': (2, 2), 'glass': (1, 1), 'leaves': (10, 60)}
+BLOCK_TICKING = np.array([name in TICK_DELAYS for name in BLOCK_NAMES], dtype=bool)
+WOOD, LEAVES, GLASS = BLOCK_IDS['wood'], BLOCK_IDS['leaves'], BLOCK_IDS['glass']
+
+tick_queue = []     # heap of (due tick, cell)
+tick_due = {}       # cell -> due tick of its live heap entry
+game_tick = 0
+tick_clock = 0.0    # seconds not yet turned into ticks
+block_updates = 0   # updates run so far
+
+def schedule_tick(cell, delay):
+    # A cell already due sooner keeps that slot; an entry superseded by an
+    # earlier one stays in the heap and is skipped when popped
+    due = game_tick + delay
+    if tick_due.get(cell, math.inf) <= due:
         return
-    if not solid[ix][iy][iz]:
+    tick_due[cell] = due
+    heapq.heappush(tick_queue, (due, cell))
+
+def wake_block(ix, iy, iz):
+    block_id = get_block(ix, iy, iz)
+    if BLOCK_TICKING[block_id]:
+        schedule_tick((ix, iy, iz), random.randint(*TICK_DELAYS[BLOCK_NAMES[block_id]]))
+
+def wake_blocks(lo, hi, block_id=None):
+    # Every ticking block (or just those of block_id) in index box [lo, hi)
+    region = read_region(lo, hi)
+    ticking = BLOCK_TICKING[region] if block_id is None else region == block_id
+    for x, y, z in (np.argwhere(ticking) + lo).tolist():
+        if in_bounds(x, y, z):
+            wake_block(x, y, z)
+
+def wake_neighbours(ix, iy, iz, old_id):
+    # After the block at (ix, iy, iz) changed: it and its face neighbours,
+    # and the leaves it may have held up if it was wood
+    wake_block(ix, iy, iz)
+    for dx, dy, dz in neighbors:
+        wake_block(ix + dx, iy + dy, iz + dz)
+    if old_id == WOOD:
+        r = LEAF_DECAY_RANGE
+        wake_blocks((ix - r, iy - r, iz - r), (ix + r + 1, iy + r + 1, iz + r + 1), LEAVES)
+
+def tick_falling(ix, iy, iz):
+    # Drop one cell into air, smashing glass on the way; each move wakes
+    # the block again at its new cell
+    if not in_bounds(ix, iy - 1, iz):
         return
-    # Remove block
-    solid[ix][iy][iz] = False
-    block_type[ix][iy][iz] = AIR
-    despawn_block_entity(wpos)
-    # Expose neighbors that were interior
-    refresh_neighbors_surface(ix, iy, iz)
-
-# ---------- Build world ----------
-def build_world():
-    gen_world_arrays()
-    # Spawn only exposed blocks
-    for ix in range(WORLD_X):
-        for iy in range(WORLD_Y):
-            for iz in range(WORLD_Z):
-                if solid[ix][iy][iz] and is_exposed(ix, iy, iz):
-                    spawn_surface_block(ix, iy, iz)
+    below = get_block(ix, iy - 1, iz)
+    if below == GLASS:
+        place_array(ix, iy - 1, iz, 'air', overwrite_air_only=False)
+    elif below == AIR and (ix, iy - 1, iz) in player_cells():
+        # Rest on the player for now and try again once they've moved
+        wake_block(ix, iy, iz)
+    elif below == AIR:
+        block_type = BLOCK_NAMES[get_block(ix, iy, iz)]
+        place_array(ix, iy, iz, 'air', overwrite_air_only=False)
+        place_array(ix, iy - 1, iz, block_type)
+
+def tick_leaves(ix, iy, iz):
+    r = LEAF_DECAY_RANGE
+    near = read_region((ix - r, iy - r, iz - r), (ix + r + 1, iy + r + 1, iz + r + 1))
+    if not np.any(near == WOOD):
+        place_array(ix, iy, iz, 'air', overwrite_air_only=False)
+
+def tick_glass(ix, iy, iz):
+    # Glass left with nothing solid on any side shatters
+    if not any(is_solid(ix + dx, iy + dy, iz + dz) for dx, dy, dz in neighbors):
+        place_array(ix, iy, iz, 'air', overwrite_air_only=False)
+
+TICK_HANDLERS = {BLOCK_IDS['sand']: tick_falling, LEAVES: tick_leaves, GLASS: tick_glass}
+
+def block_tick():
+    # Run the updates due by now, earliest first, up to MAX_BLOCK_UPDATES;
+    # returns how many ran
+    global block_updates
+    ran = 0
+    while tick_queue and tick_queue[0][0] <= game_tick and ran < MAX_BLOCK_UPDATES:
+        due, cell = heapq.heappop(tick_queue)
+        if tick_due.get(cell) != due:
+            continue
+        del tick_due[cell]
+        # Blocks in chunks unloaded since they were woken are dropped
+        handler = TICK_HANDLERS.get(get_block(*cell)) if in_bounds(*cell) else None
+        if handler:
+            handler(*cell)
+            ran += 1
+    block_updates += ran
+    return ran
+
+def run_block_ticks(dt):
+    # Advance the tick clock by dt seconds and run the ticks that passed
+    global game_tick, tick_clock
+    tick_clock = min(tick_clock + dt, MAX_CATCHUP_TICKS / TICKS_PER_SECOND)
+    while tick_clock >= 1 / TICKS_PER_SECOND:
+        tick_clock -= 1 / TICKS_PER_SECOND
+        game_tick += 1
+        block_tick()
 
 # ---------- Player ----------
 player = None
 
+class GridPlayer(FirstPersonController):
+    # Moves the player's axis-aligned box one axis at a time and pushes it back
+    # out of any solid cell it enters. Cost depends on the box size only.
+    half_width = .3
+    box_height = 1.8
+    fall_acceleration = 25      # per unit of `gravity`
+    max_fall_speed = 50
+    fly_speed = 6
+
+    def __init__(self, **kwargs):
+        self.velocity_y = 0.0
+        super().__init__(**kwargs)
+
+    def box_cells(self, pos):
+        # Cells the player's box overlaps when standing at pos
+        x, y, z = pos
+        lo = world_to_grid(x - self.half_width, y, z - self.half_width)
+        hi = world_to_grid(x + self.half_width, y + self.box_height, z + self.half_width)
+        return [(ix, iy, iz)
+                for ix in range(math.floor(lo[0]), math.ceil(hi[0]))
+                for iy in range(math.floor(lo[1]), math.ceil(hi[1]))
+                for iz in range(math.floor(lo[2]), math.ceil(hi[2]))]
+
+    def box_hits_solid(self, pos):
+        return any(in_bounds(*cell) and is_solid(*cell) for cell in self.box_cells(pos))
+
+    def move_axis(self, axis, amount):
+        # Returns True if a solid cell stopped the move
+        if amount == 0:
+            return False
+        pos = [self.x, self.y, self.z]
+        # Box faces relative to pos along this axis
+        lo_ext, hi_ext = (0, self.box_height) if axis == 1 else (-self.half_width, self.half_width)
+        steps = max(1, math.ceil(abs(amount) / .45))   # never skip a whole cell
+        blocked = False
+        for _ in range(steps):
+            pos[axis] += amount / steps
+            if self.box_hits_solid(pos):
+                # Snap the leading face back to the cell boundary it crossed
+                edge = world_to_grid(*pos)[axis] + (hi_ext if amount > 0 else lo_ext)
+                if amount > 0:
+                    pos[axis] -= edge - math.floor(edge) + 1e-4
+                else:
+                    pos[axis] += math.floor(edge) + 1 - edge + 1e-4
+                blocked = True
+                break
+        self.position = Vec3(*pos)
+        return blocked
+
+    def update(self):
+        # Ursina runs this with the other entities, after update(); it counts
+        # towards the same profiler phase
+        start = time.perf_counter()
+        self.walk()
+        profile_phase('update', start)
+
+    def walk(self):
+        self.rotation_y += mouse.velocity[0] * self.mouse_sensitivity[1]
+        self.camera_pivot.rotation_x -= mouse.velocity[1] * self.mouse_sensitivity[0]
+        self.camera_pivot.rotation_x = clamp(self.camera_pivot.rotation_x, -90, 90)
+        # Hold still until the ground under us has streamed in
+        cx, _, cz = player_chunk()
+        if (cx, 0, cz) not in chunks:
+            return
+
+        self.direction = Vec3(
+            self.forward * (held_keys['w'] - held_keys['s'])
+            + self.right * (held_keys['d'] - held_keys['a'])
+            ).normalized()
+        dt = min(time.dt, .05)     # a hitch shouldn't teleport the player
+        move = self.direction * dt * self.speed
+        self.move_axis(0, move.x)
+        self.move_axis(2, move.z)
+
+        if flying:
+            self.velocity_y = dy = (held_keys['space'] - held_keys['left control']) * self.fly_speed
+        else:
+            v0 = self.velocity_y
+            self.velocity_y = max(v0 - self.fall_acceleration * self.gravity * dt, -self.max_fall_speed)
+            dy = (v0 + self.velocity_y) / 2    # exact for constant acceleration, so jumps don't depend on frame rate
+        blocked = self.move_axis(1, dy * dt)
+        self.grounded = blocked and self.velocity_y <= 0 and not flying
+        if blocked:
+            self.velocity_y = 0.0
+
+    def input(self, key):
+        if key == 'space' and self.grounded and not flying:
+            self.velocity_y = math.sqrt(2 * self.fall_acceleration * self.gravity * self.jump_height)
+
 def make_player():
     global player
-    # Spawn at highest solid near center
-    sx, sz = WORLD_X // 2, WORLD_Z // 2
-    sy = WORLD_Y - 1
-    for y in reversed(range(WORLD_Y)):
-        if solid[sx][y][sz]:
-            sy = y + 3
-            break
+    # Spawn above the highest solid near center
+    sx, _, sz = to_index(0, 0, 0)
+    top = column_top(sx, sz)
+    sy = top + 3 if top is not None and top >= 0 else WORLD_Y - 1
     wx, wy, wz = to_world(sx, sy, sz)
-    player = FirstPersonController(x=wx, y=wy, z=wz)
+    controller = GridPlayer if PLAYER_PHYSICS == 'grid' else FirstPersonController
+    player = controller(x=wx, y=wy, z=wz)
     player.cursor = False
     player.speed = 6
     player.gravity = 1.0
@@ -298,21 +2332,22 @@ def set_flying(on: bool):
         player.gravity = 0.0 if flying else 1.0
 
 # ---------- Menus ----------
-menu_panel = Panel(scale=(0.75, 0.65), color=color.rgba(0,0,0,180), enabled=True)
-menu_title = Text("Cavegame 1.0", parent=menu_panel, y=.23, scale=2, color=color.azure)
-menu_sub = Text("Creative. Caves. Trees. Flight. No files. 60 FPS target.", parent=menu_panel, y=.18, scale=1, color=color.gray)
-fps_label_menu = Text("FPS target: 60", parent=menu_panel, y=.13, scale=1, color=color.lime)
+if MAIN_PROCESS:
+    menu_panel = Panel(scale=(0.75, 0.65), color=color.rgba(0,0,0,180), enabled=True)
+    menu_title = Text("Cavegame 1.0", parent=menu_panel, y=.23, scale=2, color=color.azure)
+    menu_sub = Text("Creative. Caves. Trees. Flight. No files. 60 FPS target.", parent=menu_panel, y=.18, scale=1, color=color.gray)
+    fps_label_menu = Text("FPS target: 60", parent=menu_panel, y=.13, scale=1, color=color.lime)
 
-start_btn = Button("Start", parent=menu_panel, y=.05, scale=(.3, .08))
-fs_btn = Button("Toggle Fullscreen (F11)", parent=menu_panel, y=-.05, scale=(.45, .08))
-quit_btn = Button("Quit", parent=menu_panel, y=-.15, scale=(.3, .08))
-pause_tip = Text("Paused", parent=menu_panel, y=.23, scale=2, color=color.azure, enabled=False)
+    start_btn = Button("Start", parent=menu_panel, y=.05, scale=(.3, .08))
+    fs_btn = Button("Toggle Fullscreen (F11)", parent=menu_panel, y=-.05, scale=(.45, .08))
+    quit_btn = Button("Quit", parent=menu_panel, y=-.15, scale=(.3, .08))
+    pause_tip = Text("Paused", parent=menu_panel, y=.23, scale=2, color=color.azure, enabled=False)
 
 def start_game():
     global game_started, paused
     if not game_started:
-        build_world()
-        make_player()
+        # The world streams in from here; update() adds the player once the
+        # ground under the spawn point is there
         game_started = True
     paused = False
     menu_panel.enabled = False
@@ -325,9 +2360,10 @@ def start_game():
 def toggle_fullscreen():
     window.fullscreen = not window.fullscreen
 
-start_btn.on_click = start_game
-fs_btn.on_click = toggle_fullscreen
-quit_btn.on_click = application.quit
+if MAIN_PROCESS:
+    start_btn.on_click = start_game
+    fs_btn.on_click = toggle_fullscreen
+    quit_btn.on_click = application.quit
 
 def show_menu(title="Paused"):
     global paused
@@ -353,6 +2389,7 @@ def hide_menu():
 # ---------- Input handling ----------
 def input(key):
     global current_block_type
+    start = time.perf_counter()
     if key == 'escape':
         if paused:
             hide_menu()
@@ -362,27 +2399,234 @@ def input(key):
         toggle_fullscreen()
     if key == 'f':
         set_flying(not flying)
+    if key == 'f3':
+        toggle_profiler()
+    if key == 'f4':
+        dump_profile()
+    if key == 'm' and game_started:
+        compare_meshers()
+        cycle_mesher()
 
     # Block palette
-    if key in ('1','2','3','4','5','6'):
+    if key in ('1','2','3','4','5','6','7'):
         idx = int(key) - 1
         current_block_type = PALETTE_KEYS[idx]
 
+    # Bulk edits around the block under the reticle
+    if not paused and key in ('b', 'x', 'r'):
+        hit = hovered_block()
+        if hit:
+            bulk_edit(key, hit)
+
+    # Break / place on the block under the reticle
+    if not paused and key in ('left mouse down', 'right mouse down'):
+        hit = hovered_block()
+        if hit:
+            wpos, normal = hit
+            if key == 'left mouse down':
+                break_block(wpos)
+            else:
+                place_adjacent(wpos, normal)
+    profile_phase('input', start)
+
 # ---------- Update loop ----------
 def update():
-    update_fps_label()
+    start = time.perf_counter()
+    if game_started:
+        update_streaming()
+    if player and not paused:
+        run_block_ticks(time.dt)
+    run_jobs()
+    start = profile_phase('jobs', start)
+    if game_started and not player:
+        sx, _, sz = to_index(0, 0, 0)
+        if column_top(sx, sz) is not None:
+            make_player()
+    cull_chunks()
+    sort_alpha_chunks()
+    refresh_text = update_fps_label()
+    if profiler_text.enabled:
+        update_profiler(refresh_text)
     if not player or paused:
+        hover_box.enabled = False
+        profile_phase('update', start)
         return
 
-    # Flight vertical movement
-    if flying:
+    # Highlight the block under the reticle
+    hit = hovered_block()
+    hover_box.enabled = hit is not None
+    if hit:
+        wx, wy, wz = hit[0]
+        hover_box.position = (wx, wy - .5, wz)
+
+    # Flight vertical movement (GridPlayer handles its own)
+    if flying and PLAYER_PHYSICS == 'collider':
         up = held_keys['space'] - held_keys['left control']
         player.y += up * time.dt * 6
 
     # Keep player within reasonable bounds vertically
     if player.y < -40:
-        player.y = 20
+        ix, _, iz = world_to_grid(*player.position)
+        top = column_top(math.floor(ix), math.floor(iz))
+        player.y = to_world(0, top + 3, 0)[1] if top is not None and top >= 0 else 20
+    profile_phase('update', start)
+
+# ---------- Benchmarks ----------
+def benchmark_generation(size=(256, WORLD_Y, 256), repeats=3):
+    # Terrain, cave and tree generation throughput, whole box and per chunk
+    lo = (0, 0, 0)
+    for name, hi in (('chunk', (CHUNK_SIZE,) * 3), ('padded chunk', (CHUNK_SIZE + 2,) * 3), ('box', size)):
+        best = math.inf
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            generate_region(lo, hi)
+            best = min(best, time.perf_counter() - t0)
+        voxels = math.prod(hi)
+        print(f'{name:>12} {hi[0]}x{hi[1]}x{hi[2]}: {best * 1000:8.2f} ms  '
+              f'{voxels / best / 1e6:6.2f} M voxels/s')
+
+def benchmark_world(size=None, edits=200, mesher_name=None, out=None):
+    """Run the chunk pipeline headless over a size[0] x WORLD_Y x size[2] area.
+
+    Phases run one after another over every chunk, the same steps a worker
+    and the main thread do while streaming: generate, light, surface
+    extraction, meshing and upload, then `edits` scripted break/place
+    operations, each remeshed before the next, one of each bulk edit, a
+    slab of sand dropped through the area on block ticks, and LOD meshes of
+    every column at each level. Prints a JSON
+    report of per-phase timings, peak memory and counts, and writes it to
+    `out`.
+    """
+    sx, _, sz = size or BENCH_SIZE or (64, WORLD_Y, 64)
+    # Whole chunk columns, as the report says
+    sx, sz = (-(-n // CHUNK_SIZE) * CHUNK_SIZE for n in (sx, sz))
+    mesher_name = mesher_name or mesher
+    columns = [(cx, cz) for cx in range(sx // CHUNK_SIZE) for cz in range(sz // CHUNK_SIZE)]
+    keys = [key for cx, cz in columns for key in column_keys(cx, cz)]
+    phases = {}
+
+    def timed(name, fn):
+        t0 = time.perf_counter()
+        result = fn()
+        phases[name] = round((time.perf_counter() - t0) * 1000, 2)
+        return result
+
+    def generate():
+        for cx, cz in columns:
+            world = generated_column(cx, cz)
+            for key in column_keys(cx, cz):
+                y0 = key[1] * CHUNK_SIZE + 1
+                blocks = world[:, y0:y0 + CHUNK_SIZE]
+                chunks[key] = PaletteChunk.from_array(blocks)
+                chunk_tops[key] = solid_tops(blocks)
+                chunk_connectivity[key] = face_connectivity(blocks)
+
+    def light():
+        for cx, cz in columns:
+            lit = skylight(read_region(*light_box((cx, 0, cz))), -1)
+            for key in column_keys(cx, cz):
+                chunk_light[key] = chunk_in_box(lit, key)[1:-1, 1:-1, 1:-1].copy()
+
+    def surface():
+        pads = {key: padded_chunk(key) for key in keys}
+        return pads, sum(int(np.count_nonzero(visible_faces(pad))) for pad in pads.values())
+
+    timed('generate', generate)
+    timed('light', light)
+    pads, faces = timed('surface', surface)
+    meshes = timed('mesh', lambda: {key: MESHERS[mesher_name](pad, padded_light(key)) for key, pad in pads.items()})
+    timed('upload', lambda: [upload_chunk_mesh(key, data) for key, data in meshes.items()])
+    del pads, meshes
+
+    # Alternately break the top block of a column and stack stone on one
+    rng = random.Random(TERRAIN_SEED)
+    edit_ms = []
+    for i in range(edits):
+        ix, iz = rng.randrange(sx), rng.randrange(sz)
+        top = column_top(ix, iz)
+        t0 = time.perf_counter()
+        if i % 2 == 0 and top >= 0:
+            place_array(ix, top, iz, 'air', overwrite_air_only=False)
+        elif top + 1 < WORLD_Y:
+            place_array(ix, top + 1, iz, 'stone')
+        run_jobs(budget_ms=math.inf)
+        edit_ms.append((time.perf_counter() - t0) * 1000)
+    phases['edits'] = round(sum(edit_ms), 2)
+
+    def bulk():
+        # One of each region edit in the middle of the area, then remesh
+        mx, mz, my = sx // 2, sz // 2, WORLD_Y // 2
+        n = (fill_box((mx - 8, my, mz - 8), (mx + 8, my + 8, mz + 8), 'stone')
+             + carve_sphere((mx, my // 2, mz), 6)
+             + replace_blocks((0, 0, 0), (sx, WORLD_Y, sz), 'dirt', 'glass'))
+        run_jobs(budget_ms=math.inf)
+        return n
+
+    bulk_blocks = timed('bulk', bulk)
+
+    def ticks():
+        # Drop a slab of sand from the top of the world and tick until
+        # everything it woke has settled
+        mx, mz = sx // 2, sz // 2
+        fill_box((mx - 8, WORLD_Y - 2, mz - 8), (mx + 8, WORLD_Y, mz + 8), 'sand')
+        pending = len(tick_due)
+        updates = block_updates
+        while tick_due:
+            run_block_ticks(1 / TICKS_PER_SECOND)
+        run_jobs(budget_ms=math.inf)
+        return pending, block_updates - updates
+
+    ticks_woken, tick_updates = timed('ticks', ticks)
+
+    def lod():
+        # Every column again as a distant LOD mesh at each level, for
+        # comparison with 'vertices'
+        return {step: sum(len(lod_mesh(column_blocks(c), step)['vertices']) // 3 for c in columns)
+                for _, step in LOD_LEVELS}
+
+    lod_vertices = timed('lod', lod)
+
+    report = {
+        'size': [sx, WORLD_Y, sz],
+        'mesher': mesher_name,
+        'phases_ms': phases,
+        'edit_ms': {'count': edits,
+                    'mean': round(sum(edit_ms) / max(edits, 1), 3),
+                    'max': round(max(edit_ms, default=0), 3)},
+        # ru_maxrss is in KB on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1) if resource else None,
+        'counts': {
+            'chunks': len(chunks),
+            'chunk_bytes': sum(c.nbytes for c in chunks.values()),
+            'faces': faces,
+            'bulk_blocks': bulk_blocks,
+            'ticks_woken': ticks_woken,
+            'block_updates': tick_updates,
+            'vertices': sum(chunk_vertex_counts.values()),
+            'lod_vertices': lod_vertices,
+            'chunk_entities': len(chunk_entities),
+            'alpha_passes': len(chunk_alpha),
+            'entities': len(scene.entities),
+        },
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if out:
+        with open(out, 'w') as f:
+            f.write(text + '\n')
+    return report
+
+BENCHMARKS = {
+    'surface': benchmark_surface_extraction,
+    'generation': benchmark_generation,
+    'world': lambda: benchmark_world(edits=int(BENCH_ARGS.get('edits', 200)),
+                                     mesher_name=BENCH_ARGS.get('mesher'), out=BENCH_ARGS.get('out')),
+}
 
 # ---------- Start at main menu ----------
-show_menu("Cavegame 1.0")
-app.run()
+if MAIN_PROCESS:
+    if BENCHMARK:
+        BENCHMARKS[BENCHMARK]()
+    else:
+        show_menu("Cavegame 1.0")
+        app.run()
@@ -2,9 +2,10 @@
 # NES-flavored Super Mario World-inspired, multi-world remix.
 # Single file. No assets. 60 FPS. PS1/NES vibes. Autogenerated levels.
 # Requires: pip install pygame
+# python smw4k.py --bench-tiles times the per-frame tile queries instead of playing
 
 import pygame as pg
-import sys, random, math, threading
+import sys, random, math, threading, time
 
 # ---- tiny beeps (winsound if available, safe fallback) ----
 def _noop(*a, **k): pass
@@ -74,6 +75,17 @@ __ALL_TILES__ = " #.=C?B^PpG|HWTKLRk~"
 # 'H' hard block, 'W' water (swim), 'T' spring, 'K' crate, 'L' lava, 'R' rope,
 # 'k' castle brick, '~' waterfall deco
 
+# Levels keep tiles as ids (index into __ALL_TILES__) in one flat bytearray;
+# TILE_FLAGS[id] says what physics does with each
+F_SOLID, F_ONEWAY, F_HAZARD, F_COIN, F_WATER, F_GOAL, F_SPRING, F_PIPE = (1 << i for i in range(8))
+TILE_ID = {ch: i for i, ch in enumerate(__ALL_TILES__)}
+TILE_FLAGS = bytes(
+    (F_SOLID if ch in SOLID else 0) | (F_ONEWAY if ch == '=' else 0) | (F_HAZARD if ch in '^L' else 0)
+    | (F_COIN if ch == 'C' else 0) | (F_WATER if ch == 'W' else 0) | (F_GOAL if ch in 'G|' else 0)
+    | (F_SPRING if ch == 'T' else 0) | (F_PIPE if ch == 'P' else 0)
+    for ch in __ALL_TILES__)
+T_AIR, T_DECO, T_QUESTION, T_BRICK, T_HARD = (TILE_ID[ch] for ch in ' .?BH')
+
 # ---- level generation (procedural patterns per world) ----
 def gen_level(world, stage, seed=None):
     rnd = random.Random((hash(world) ^ (stage*7777)) if seed is None else seed)
@@ -231,9 +243,10 @@ class Level:
     def __init__(self, world, stage):
         self.world = world
         self.stage = stage
-        self.rows, self.enemies, self.ground_y, self.w = gen_level(world, stage)
-        self.h = len(self.rows)
-        self.mod = {}  # (tx,ty)->char for dynamic changes (hit blocks, coins)
+        rows, self.enemies, self.ground_y, self.w = gen_level(world, stage)
+        self.h = len(rows)
+        # tile ids, row-major: tile (tx,ty) is tiles[ty*w + tx]; edits (hit blocks, coins) write here
+        self.tiles = bytearray(TILE_ID[ch] for row in rows for ch in row)
         self.camera_x = 0.0
         self.completed = False
         self.dead = False
@@ -245,38 +258,37 @@ class Level:
 
     def get(self, tx, ty):
         if not self.in_bounds(tx, ty): return ' '
-        return self.mod.get((tx,ty), self.rows[ty][tx])
+        return __ALL_TILES__[self.tiles[ty*self.w + tx]]
 
     def set_tile(self, tx, ty, ch):
         if self.in_bounds(tx,ty):
-            self.mod[(tx,ty)] = ch
+            self.tiles[ty*self.w + tx] = TILE_ID[ch]
 
     def solids_rects(self, rect):
+        # (tile rect, flags) for solid tiles around rect; callers treat F_ONEWAY as top-only
         out = []
+        tiles, w = self.tiles, self.w
         tx0 = max(0, int(rect.left//TILE) - 1)
-        tx1 = min(self.w-1, int(rect.right//TILE) + 1)
+        tx1 = min(w-1, int(rect.right//TILE) + 1)
         ty0 = max(0, int(rect.top//TILE) - 1)
         ty1 = min(self.h-1, int(rect.bottom//TILE) + 1)
         for ty in range(ty0, ty1+1):
+            row = ty*w
             for tx in range(tx0, tx1+1):
-                ch = self.get(tx,ty)
-                if ch in SOLID or ch in ('='):
-                    # '=' treated as solid from top only later
-                    out.append((pg.Rect(tx*TILE, ty*TILE, TILE, TILE), ch))
+                fl = TILE_FLAGS[tiles[row + tx]]
+                if fl & F_SOLID:
+                    out.append((pg.Rect(tx*TILE, ty*TILE, TILE, TILE), fl))
         return out
 
     def coins_rects(self, rect):
+        # (tx,ty) of coins overlapping rect
+        tiles, w = self.tiles, self.w
         res = []
-        tx0 = max(0, int(rect.left//TILE)-1)
-        tx1 = min(self.w-1, int(rect.right//TILE)+1)
-        ty0 = max(0, int(rect.top//TILE)-1)
-        ty1 = min(self.h-1, int(rect.bottom//TILE)+1)
-        for ty in range(ty0, ty1+1):
-            for tx in range(tx0, tx1+1):
-                if self.get(tx,ty) == 'C':
-                    r = pg.Rect(tx*TILE, ty*TILE, TILE, TILE)
-                    if rect.colliderect(r):
-                        res.append((tx,ty))
+        for ty in range(max(0, rect.top//TILE), min(self.h-1, (rect.bottom-1)//TILE) + 1):
+            row = ty*w
+            for tx in range(max(0, rect.left//TILE), min(w-1, (rect.right-1)//TILE) + 1):
+                if TILE_FLAGS[tiles[row + tx]] & F_COIN:
+                    res.append((tx,ty))
         return res
 
 # ---- player ----
@@ -331,8 +343,11 @@ def update_player(pl, lvl, dt, keys, run_pressed, jump_pressed, jump_held, theme
     else:
         pl.vx = clamp(pl.vx, -max_spd, max_spd)
 
-    # gravity
-    water = tile_under(lvl, pl.rect, 'W')
+    # gravity; water is sensed 2px under the feet and springs 1px, from one query
+    # over both probes (both tiles are solid, so they come back with positions)
+    feet = pl.rect.move(0,1); feet.h += 1
+    _, under, _ = tile_contacts(lvl, feet)
+    water = any(fl & F_WATER and (ty+1)*TILE > feet.top+1 for tx, ty, fl in under)
     grav = GRAVITY * (0.35 if water else 1.0)
     pl.vy = min(TERMINAL_V*(0.35 if water else 1.0), pl.vy + grav*dt)
 
@@ -349,7 +364,7 @@ def update_player(pl, lvl, dt, keys, run_pressed, jump_pressed, jump_held, theme
         pl.jump_hold = 0
 
     # springs
-    if collide_with_tile(lvl, pl.rect.move(0,1), 'T'):
+    if any(fl & F_SPRING and ty*TILE < feet.bottom-1 for tx, ty, fl in under):
         pl.vy = -JUMP_VELOCITY*1.4
         sfx('power')
 
@@ -357,12 +372,13 @@ def update_player(pl, lvl, dt, keys, run_pressed, jump_pressed, jump_held, theme
     # horizontal
     nx = pl.x + pl.vx*dt
     rect_next = pg.Rect(int(nx)-pl.w//2, pl.rect.top, pl.w, pl.h)
-    solids = lvl.solids_rects(rect_next)
+    _, solids, _ = tile_contacts(lvl, rect_next)
     blocked = False
-    for r, ch in solids:
+    for tx, ty, fl in solids:
+        r = pg.Rect(tx*TILE, ty*TILE, TILE, TILE)
         if rect_next.colliderect(r):
             # allow passing through '=' from below
-            if ch == '=':
+            if fl & F_ONEWAY:
                 continue
             blocked = True
             if pl.vx > 0:
@@ -375,11 +391,12 @@ def update_player(pl, lvl, dt, keys, run_pressed, jump_pressed, jump_held, theme
     # vertical
     ny = pl.y + pl.vy*dt
     rect_next = pg.Rect(pl.rect.left, int(ny)-pl.h, pl.w, pl.h)
-    solids = lvl.solids_rects(rect_next)
+    _, solids, _ = tile_contacts(lvl, rect_next)
     new_on_ground = False
-    for r, ch in solids:
+    for tx, ty, fl in solids:
+        r = pg.Rect(tx*TILE, ty*TILE, TILE, TILE)
         if rect_next.colliderect(r):
-            top_only = (ch == '=')
+            top_only = fl & F_ONEWAY
             if pl.vy > 0:
                 if top_only and rect_next.bottom - r.top < 10:
                     rect_next.bottom = r.top
@@ -393,23 +410,25 @@ def update_player(pl, lvl, dt, keys, run_pressed, jump_pressed, jump_held, theme
                 rect_next.top = r.bottom
                 pl.vy = 0
                 # bump blocks
-                hit_block_pos = (r.left//TILE, r.top//TILE)
-                bump_block(lvl, hit_block_pos)
+                bump_block(lvl, (tx, ty))
     pl.y = rect_next.bottom
     pl.on_ground = new_on_ground
 
+    # everything the player now overlaps, in one pass
+    touched, _, coins = tile_contacts(lvl, pl.rect)
+
     # spikes/lava
-    if collide_with_tile(lvl, pl.rect, '^') or collide_with_tile(lvl, pl.rect, 'L'):
+    if touched & F_HAZARD:
         player_die(pl, lvl)
 
     # pipe down
     if keys[pg.K_DOWN] and pl.on_ground:
-        if collide_with_tile(lvl, pl.rect, 'P'):
+        if touched & F_PIPE:
             sfx('pipe')
             lvl.completed = True  # treat as warp->goal
 
     # coins pickup
-    for tx,ty in lvl.coins_rects(pl.rect):
+    for tx,ty in coins:
         lvl.set_tile(tx,ty,'.')
         pl.coins += 1
         sfx('coin')
@@ -423,7 +442,7 @@ def update_player(pl, lvl, dt, keys, run_pressed, jump_pressed, jump_held, theme
             player_die(pl, lvl)
 
     # goal
-    if collide_with_tile(lvl, pl.rect, 'G') or collide_with_tile(lvl, pl.rect, '|'):
+    if touched & F_GOAL:
         lvl.completed = True
         sfx('goal')
 
@@ -432,34 +451,49 @@ def approach(v, target, delta):
     if v > target: return max(v-delta, target)
     return v
 
-def collide_with_tile(lvl, rect, tile_char):
-    tx0 = max(0, rect.left//TILE - 1)
-    tx1 = min(lvl.w-1, rect.right//TILE + 1)
-    ty0 = max(0, rect.top//TILE - 1)
-    ty1 = min(lvl.h-1, rect.bottom//TILE + 1)
-    for ty in range(ty0, ty1+1):
+def collide_with_tile(lvl, rect, flags):
+    # does rect overlap any tile with one of `flags`
+    tiles, w = lvl.tiles, lvl.w
+    tx0 = max(0, rect.left//TILE); tx1 = min(w-1, (rect.right-1)//TILE)
+    for ty in range(max(0, rect.top//TILE), min(lvl.h-1, (rect.bottom-1)//TILE) + 1):
+        row = ty*w
         for tx in range(tx0, tx1+1):
-            if lvl.get(tx,ty) == tile_char:
-                if rect.colliderect(pg.Rect(tx*TILE, ty*TILE, TILE, TILE)):
-                    return True
+            if TILE_FLAGS[tiles[row + tx]] & flags:
+                return True
     return False
 
-def tile_under(lvl, rect, tile_char):
+def tile_under(lvl, rect, flags):
     probe = rect.move(0, 2)
-    return collide_with_tile(lvl, probe, tile_char)
+    return collide_with_tile(lvl, probe, flags)
+
+def tile_contacts(lvl, rect):
+    # one walk over the tiles rect overlaps: (OR of their flags, [(tx,ty,flags)] solids, [(tx,ty)] coins)
+    tiles, w = lvl.tiles, lvl.w
+    touched = 0; solids = []; coins = []
+    tx0 = max(0, rect.left//TILE); tx1 = min(w-1, (rect.right-1)//TILE)
+    for ty in range(max(0, rect.top//TILE), min(lvl.h-1, (rect.bottom-1)//TILE) + 1):
+        row = ty*w
+        for tx in range(tx0, tx1+1):
+            fl = TILE_FLAGS[tiles[row + tx]]
+            if not fl: continue
+            touched |= fl
+            if fl & F_SOLID: solids.append((tx, ty, fl))
+            elif fl & F_COIN: coins.append((tx, ty))
+    return touched, solids, coins
 
 def bump_block(lvl, pos):
     tx, ty = pos
-    ch = lvl.get(tx,ty)
-    below = lvl.get(tx,ty+1)
+    if not lvl.in_bounds(tx, ty): return
+    i = ty*lvl.w + tx
+    tid = lvl.tiles[i]
     # '?' -> coin and become '.'
-    if ch == '?':
-        lvl.set_tile(tx,ty,'.')
+    if tid == T_QUESTION:
+        lvl.tiles[i] = T_DECO
         sfx('coin')
-    elif ch == 'B':  # brick shatter to '.'
-        lvl.set_tile(tx,ty,'.')
+    elif tid == T_BRICK:  # brick shatter to '.'
+        lvl.tiles[i] = T_DECO
         sfx('hit')
-    elif ch == 'H':  # hard block stays
+    elif tid == T_HARD:  # hard block stays
         sfx('hit')
 
 def player_die(pl, lvl):
@@ -488,11 +522,8 @@ def update_enemies(lvl, enemies, dt, pl):
         # horizontal
         nx = e['x'] + e['vx']*dt
         rect_next = rect.copy(); rect_next.centerx = int(nx)
-        blocked = False
-        for r,ch in lvl.solids_rects(rect_next):
-            if rect_next.colliderect(r) and ch != '=':
-                blocked = True
-                break
+        _, solids, _ = tile_contacts(lvl, rect_next)
+        blocked = any(not fl & F_ONEWAY for _, _, fl in solids)
         if blocked:
             e['dir'] *= -1
         else:
@@ -502,13 +533,15 @@ def update_enemies(lvl, enemies, dt, pl):
         ny = e['y'] + e['vy']*dt
         rect_next = pg.Rect(int(e['x'])-6, int(ny)-12, 12, 12)
         grounded = False
-        for r,ch in lvl.solids_rects(rect_next):
+        _, solids, _ = tile_contacts(lvl, rect_next)
+        for tx, ty, fl in solids:
+            r = pg.Rect(tx*TILE, ty*TILE, TILE, TILE)
             if rect_next.colliderect(r):
                 if e['vy'] > 0:
                     rect_next.bottom = r.top
                     e['vy'] = 0
                     grounded = True
-                elif e['vy'] < 0 and ch != '=':
+                elif e['vy'] < 0 and not fl & F_ONEWAY:
                     rect_next.top = r.bottom
                     e['vy'] = 0
         e['y'] = rect_next.bottom
@@ -556,6 +589,11 @@ class Overworld:
                     self.nodes[i+1]['unlocked'] = True
 
 # ---- rendering helpers ----
+# fill colour per tile id: 'bg' is the world's ground colour, None its dark colour
+TILE_COLORS = [{'#': 'bg', 'k': 'bg', '=': (180, 180, 180), 'C': (255, 220, 80), '?': (200, 160, 80),
+                'B': (150, 120, 90), 'P': (100, 200, 100), 'p': (100, 200, 100), '^': (200, 60, 60),
+                'W': (100, 160, 220), 'L': (240, 80, 40), 'T': (120, 240, 120), 'G': (240, 240, 240),
+                '|': (240, 240, 240), '.': (220, 220, 240)}.get(ch) for ch in __ALL_TILES__]
 def draw_scanlines(surface):
     sl = pg.Surface((RENDER_W, 1), pg.SRCALPHA)
     sl.fill((0,0,0,28))
@@ -580,31 +618,20 @@ def draw_level(surface, lvl, pl, enemies, t, pal):
     camx = int(lvl.camera_x)
 
     # tiles
+    cols = [bg if c == 'bg' else (fg if c is None else c) for c in TILE_COLORS]
+    tiles, w = lvl.tiles, lvl.w
     ty0 = 0; ty1 = lvl.h
     tx0 = max(0, camx//TILE - 2)
-    tx1 = min(lvl.w-1, (camx+RENDER_W)//TILE + 2)
+    tx1 = min(w-1, (camx+RENDER_W)//TILE + 2)
     for ty in range(ty0, ty1):
+        row = ty*w; ry = ty*TILE
         for tx in range(tx0, tx1+1):
-            ch = lvl.get(tx,ty)
-            if ch == ' ': continue
-            rx = tx*TILE - camx; ry = ty*TILE
-            col = (0,0,0)
-            if ch in ('#','k'): col = bg
-            elif ch == '=': col = (180, 180, 180)
-            elif ch == 'C': col = (255, 220, 80)
-            elif ch == '?': col = (200, 160, 80)
-            elif ch == 'B': col = (150, 120, 90)
-            elif ch == 'P' or ch == 'p': col = (100, 200, 100)
-            elif ch == '^': col = (200, 60, 60)
-            elif ch == 'W': col = (100, 160, 220)
-            elif ch == 'L': col = (240, 80, 40)
-            elif ch == 'T': col = (120, 240, 120)
-            elif ch == 'G' or ch == '|': col = (240, 240, 240)
-            elif ch == '.': col = (220, 220, 240)
-            else: col = fg
-            pg.draw.rect(surface, col, (rx, ry, TILE, TILE))
+            tid = tiles[row + tx]
+            if tid == T_AIR: continue
+            rx = tx*TILE - camx
+            pg.draw.rect(surface, cols[tid], (rx, ry, TILE, TILE))
             # small outline for solids
-            if ch in SOLID or ch in ('='):
+            if TILE_FLAGS[tid] & F_SOLID:
                 pg.draw.rect(surface, (0,0,0), (rx, ry, TILE, TILE), 1)
 
     # enemies
@@ -661,6 +688,50 @@ def draw_overworld(surface, ow, sel_idx, t):
         name = node['world'].upper()
         draw_text(surface, name, cx-30, cy+20, (220,220,220), 1)
 
+# ---- tile query benchmark (python smw4k.py --bench-tiles) ----
+def bench_tiles(frames=20000, enemies=24):
+    # one frame's tile queries from update_player and update_enemies: per-kind scans vs tile_contacts
+    lvl = Level(WORLD_ORDER[0], 1)
+    rnd = random.Random(1)
+    rects = [pg.Rect(rnd.randrange(lvl.w*TILE - 12), lvl.ground_y*TILE - rnd.randrange(4*TILE), 12, 14) for _ in range(frames)]
+
+    def player_per_kind(r):
+        tile_under(lvl, r, F_WATER); collide_with_tile(lvl, r.move(0,1), F_SPRING)
+        lvl.solids_rects(r.move(1,0)); lvl.solids_rects(r.move(0,1))
+        collide_with_tile(lvl, r, F_HAZARD); collide_with_tile(lvl, r, F_PIPE)
+        lvl.coins_rects(r); collide_with_tile(lvl, r, F_GOAL)
+
+    def player_one_pass(r):
+        # same work update_player does with the results: probe tests and a rect per solid
+        feet = r.move(0,1); feet.h += 1
+        _, under, _ = tile_contacts(lvl, feet)
+        any(fl & F_WATER and (ty+1)*TILE > feet.top+1 for tx, ty, fl in under)
+        any(fl & F_SPRING and ty*TILE < feet.bottom-1 for tx, ty, fl in under)
+        for moved in (r.move(1,0), r.move(0,1)):
+            for tx, ty, fl in tile_contacts(lvl, moved)[1]: pg.Rect(tx*TILE, ty*TILE, TILE, TILE)
+        tile_contacts(lvl, r)
+
+    def enemies_per_kind(r):
+        for _ in range(enemies):
+            moved = r.move(1,0)
+            any(moved.colliderect(t) and not fl & F_ONEWAY for t, fl in lvl.solids_rects(moved))
+            lvl.solids_rects(r.move(0,1))
+
+    def enemies_one_pass(r):
+        for _ in range(enemies):
+            _, solids, _ = tile_contacts(lvl, r.move(1,0))
+            any(not fl & F_ONEWAY for _, _, fl in solids)
+            for tx, ty, fl in tile_contacts(lvl, r.move(0,1))[1]: pg.Rect(tx*TILE, ty*TILE, TILE, TILE)
+
+    for what, old, new in (('player', player_per_kind, player_one_pass),
+                           (f'{enemies} enemies', enemies_per_kind, enemies_one_pass)):
+        us = []
+        for fn in (old, new):
+            t0 = time.perf_counter()
+            for r in rects: fn(r)
+            us.append((time.perf_counter() - t0) / frames * 1e6)
+        print(f"{what:>12}: per-kind {us[0]:7.1f} us/frame  tile_contacts {us[1]:7.1f} us/frame  ({us[0]/us[1]:.1f}x)")
+
 # ---- main loop ----
 def main():
     pg.init()
@@ -779,4 +850,5 @@ def main():
     sys.exit()
 
 if __name__ == '__main__':
-    main()
+    if '--bench-tiles' in sys.argv: bench_tiles()
+    else: main()